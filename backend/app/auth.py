@@ -12,9 +12,18 @@ the public card-search API is unaffected.
 Both dev (Vite proxy) and prod (nginx) serve /api same-origin as the frontend,
 so SameSite=Lax cookies are set and returned correctly. In production, set
 RIB_COOKIE_SECURE=1 so the cookie is only sent over HTTPS.
+
+Resolved users are cached in-process for RIB_USER_CACHE_TTL seconds (default
+60), by user id and by key hash, so a burst of authed calls costs one lookup.
+mint_user.py bumps the auth epoch (rib_security) when it deactivates or
+re-keys someone, which empties every worker's cache on its next request; the
+TTL bounds staleness even if that signal is missed.
 """
 
 import os
+import threading
+import time
+from collections import OrderedDict
 
 from fastapi import Depends, HTTPException, Request, Response
 from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
@@ -22,7 +31,7 @@ from sqlalchemy.orm import Session
 
 from database import SessionLocal
 from models.base import User
-from rib_security import hash_key
+from rib_security import auth_epoch, hash_key
 
 COOKIE_NAME = "rib_session"
 SESSION_MAX_AGE = 60 * 60 * 24 * 30  # 30 days, in seconds
@@ -38,6 +47,68 @@ _serializer = URLSafeTimedSerializer(_SECRET, salt=_SALT)
 _COOKIE_SECURE = os.environ.get("RIB_COOKIE_SECURE", "").lower() in ("1", "true", "yes")
 
 
+_USER_CACHE_TTL = float(os.environ.get("RIB_USER_CACHE_TTL", "60"))
+_USER_CACHE_SIZE = 1024
+
+
+class _UserCache:
+    """Small TTL + LRU map of cache key -> detached, active User.
+
+    Entries are expunged from the session that loaded them, so they stay
+    readable after it closes; callers hand out `db.merge(user, load=False)`
+    copies bound to their own session, which costs no SQL.
+    """
+
+    def __init__(self, ttl: float, size: int):
+        self._ttl = ttl
+        self._size = size
+        self._entries = OrderedDict()
+        self._epoch = None
+        self._lock = threading.Lock()
+
+    def _check_epoch(self):
+        epoch = auth_epoch()
+        if epoch != self._epoch:
+            self._entries.clear()
+            self._epoch = epoch
+
+    def get(self, key):
+        with self._lock:
+            self._check_epoch()
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            user, expires = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return user
+
+    def put(self, key, user):
+        with self._lock:
+            self._entries[key] = (user, time.monotonic() + self._ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._size:
+                self._entries.popitem(last=False)
+
+
+_user_cache = _UserCache(_USER_CACHE_TTL, _USER_CACHE_SIZE)
+
+
+def _cached_user(db: Session, key, *criteria):
+    """The active User matching `criteria`, from the cache when possible."""
+    cached = _user_cache.get(key)
+    if cached is None:
+        user = db.query(User).filter(*criteria, User.active.is_(True)).one_or_none()
+        if user is None:
+            return None
+        db.expunge(user)
+        _user_cache.put(key, user)
+        cached = user
+    return db.merge(cached, load=False)
+
+
 def get_db():
     db = SessionLocal()
     try:
@@ -82,8 +153,8 @@ def get_optional_user(request: Request, db: Session = Depends(get_db)):
     """
     user_id = _user_id_from_cookie(request)
     if user_id is not None:
-        user = db.query(User).filter(User.id == user_id).one_or_none()
-        if user is not None and user.active:
+        user = _cached_user(db, ("id", user_id), User.id == user_id)
+        if user is not None:
             return user
 
     # Fallback: `Authorization: Bearer <raw_access_key>` (handy for scripts /
@@ -92,11 +163,8 @@ def get_optional_user(request: Request, db: Session = Depends(get_db)):
     if auth_header.startswith("Bearer "):
         raw_key = auth_header[len("Bearer ") :].strip()
         if raw_key:
-            user = (
-                db.query(User)
-                .filter(User.key_hash == hash_key(raw_key), User.active.is_(True))
-                .one_or_none()
-            )
+            key_hash = hash_key(raw_key)
+            user = _cached_user(db, ("key", key_hash), User.key_hash == key_hash)
             if user is not None:
                 return user
 
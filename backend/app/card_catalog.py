@@ -0,0 +1,93 @@
+"""
+@copyright Copyright 2025, Brandon Arrendondo
+See LICENSE.txt for details.
+
+Shared cards.yaml loading for the backend scripts.
+
+cards.yaml is ~90k lines, and workflow.sh runs several tools back to back that
+each parse all of it. read_cards parses with libyaml's CSafeLoader when PyYAML
+was built with it (the pure-Python SafeLoader is ~10x slower), and keeps the
+parsed result as a pickle keyed by the sha256 of the file's bytes. Every read
+after the first is then a hash and an unpickle, well under a second, until
+the file changes; any edit to cards.yaml changes the key, so a stale parse is
+never served.
+
+The cache holds one entry per source file name and is only ever written by
+this module; delete the directory to drop it. Set SRG_CATALOG_CACHE=off to
+always parse.
+
+Config via env:
+  SRG_CATALOG_CACHE      'off' to skip the parse cache
+  SRG_CATALOG_CACHE_DIR  where parses are cached (default: app/.catalog_cache)
+"""
+
+import hashlib
+import os
+import pickle
+import tempfile
+from pathlib import Path
+
+import yaml
+
+# Prefer libyaml when it is installed; the pure-Python loader takes seconds.
+_Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+CACHE_DIR = Path(
+    os.environ.get(
+        "SRG_CATALOG_CACHE_DIR",
+        str(Path(__file__).resolve().parent / ".catalog_cache"),
+    )
+)
+
+# Part of the cache key, so a change to what gets cached never reads an old
+# entry back.
+_FORMAT = 1
+
+
+def _cache_enabled() -> bool:
+    return os.environ.get("SRG_CATALOG_CACHE", "").lower() not in ("off", "0", "no")
+
+
+def parse_yaml(data):
+    """Parse YAML text or a stream with the fastest safe loader available."""
+    return yaml.load(data, Loader=_Loader)
+
+
+def _write_cache(source_name: str, entry: Path, value) -> None:
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    # Older parses of the same file are dead weight once it has changed.
+    for old in CACHE_DIR.glob(f"{source_name}.*.pickle"):
+        old.unlink(missing_ok=True)
+    # Write-then-rename, so a tool running alongside never unpickles half a file.
+    fd, tmp = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, entry)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def read_cards(path):
+    """Return the parsed contents of the YAML file at `path` (normally cards.yaml).
+
+    Each call returns a fresh object, so callers may mutate it freely.
+    """
+    path = Path(path)
+    raw = path.read_bytes()
+    if not _cache_enabled():
+        return parse_yaml(raw)
+    digest = hashlib.sha256(raw).hexdigest()
+    entry = CACHE_DIR / f"{path.name}.{_FORMAT}-{digest[:32]}.pickle"
+    try:
+        with open(entry, "rb") as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        pass
+    value = parse_yaml(raw)
+    try:
+        _write_cache(path.name, entry, value)
+    except OSError:
+        pass  # a read-only checkout still gets the (uncached) parse
+    return value
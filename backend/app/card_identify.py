@@ -0,0 +1,289 @@
+"""
+@copyright Copyright 2025, Brandon Arrendondo
+See LICENSE.txt for details.
+
+Identify a card from a photo, for POST /cards/identify.
+
+helpers/generate_hashes.py fingerprints every card image into card_hashes.db:
+a 64-bit pHash and ORB descriptors per db_uuid. Each API worker loads that
+file once into an in-memory index (and again whenever the file changes):
+
+  - every pHash in one uint64 array: the CANDIDATES nearest to the photo's
+    come from a single vectorized XOR + popcount over the whole catalog,
+    ~0.1 ms for 6.5k cards. (A BK-tree measured slower than this, and than
+    even a plain loop: a photo's pHash lands 10-20 bits from its card's,
+    where the tree has to visit nearly every node anyway.)
+  - each card's ORB descriptors, to rerank the closest of those candidates:
+    a photo's pHash is only roughly like the scan's (glare, angle), so cards
+    a few bits apart are a toss-up that matching ORB keypoints settles; too
+    slow to run catalog-wide.
+
+The upload is decoded once, to grayscale at most _MAX_SIDE px (see
+_load_photo), then pHashed and ORB-described with the same settings
+generate_hashes.py used for the cards. Results are ranked by pHash distance,
+except that the candidates within _PHASH_BAND bits of the nearest one are
+ranked among themselves by ORB good matches. ORB alone is not to be trusted
+further out: a busy, high-texture card collects plenty of chance matches, and
+ranking by them put an exact copy of a card (pHash distance 0) behind
+unrelated cards 26 bits away. Photos should be framed on the card (as the
+app's viewfinder does); background around it throws the pHash off.
+
+photo_phash and nearest_cards expose the pHash half on its own, which
+routers/submissions.py uses to tag submitted images with their probable card.
+
+Most of a lookup is decoding the upload: a full-resolution phone JPEG takes
+tens of ms before anything else starts, so the app should send a photo
+already scaled to about _MAX_SIDE px.
+
+The extra dependencies (imagehash, opencv-python-headless) are optional: the
+API starts without them and the endpoint answers 503, as it does when
+card_hashes.db has not been built yet:
+
+    python ../../helpers/generate_hashes.py images/fullsize -o card_hashes.db
+
+Uploads past MAX_PIXELS are refused from their header, before anything is
+decoded (open_photo): PNG and WebP compress so well that a byte cap alone
+lets through images that take gigabytes to decode.
+
+Config via env:
+  SRG_CARD_HASHES_DB    the fingerprint database (default: app/card_hashes.db)
+  SRG_MAX_PHOTO_PIXELS  largest image decoded, in pixels (default: 50 MP)
+"""
+
+import io
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+from PIL import Image
+
+try:
+    import cv2
+    import imagehash
+    import numpy as np
+except ImportError:  # optional: without them the endpoint is unavailable
+    cv2 = imagehash = np = None
+
+HASHES_DB = Path(
+    os.environ.get(
+        "SRG_CARD_HASHES_DB", str(Path(__file__).resolve().parent / "card_hashes.db")
+    )
+)
+
+# pHash candidates reranked with ORB per lookup.
+CANDIDATES = 24
+
+# Uploads are shrunk to this many px on their longest side before hashing:
+# about the card scans' size, while phone photos are far larger and ORB time
+# grows with area.
+_MAX_SIDE = 800
+
+# Above any phone camera's resolution (a 48 MP sensor is 8000x6000).
+MAX_PIXELS = int(os.environ.get("SRG_MAX_PHOTO_PIXELS", 50_000_000))
+
+# Candidates this many pHash bits from the nearest are reranked by ORB; on
+# synthetic photos of 400 cards, 2-3 bits placed the right card first most
+# often (ORB over all candidates: 66%, pHash alone: 96%, this band: 99%).
+_PHASH_BAND = 3
+
+# Lowe's ratio test threshold, as in helpers/find_similar.py.
+_RATIO = 0.75
+
+_DEFAULT_NFEATURES = 100
+
+
+# Set bits in every byte value, for a popcount that needs no numpy 2.
+_POPCOUNT = (
+    np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1)
+    if np is not None
+    else None
+)
+
+
+class IdentifyUnavailable(Exception):
+    """Identification can't run here (missing dependencies or index)."""
+
+
+class PhotoTooLarge(ValueError):
+    """The image has more than MAX_PIXELS pixels."""
+
+
+class _Index:
+    def __init__(self, path: Path):
+        self.mtime_ns = path.stat().st_mtime_ns
+        self.uuids = []
+        self.descriptors = []
+        phashes = []
+        nfeatures = set()
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            has_nfeatures = any(
+                row[1] == "orb_nfeatures"
+                for row in conn.execute("PRAGMA table_info(image_hashes)")
+            )
+            columns = "db_uuid, phash, orb_features"
+            if has_nfeatures:
+                columns += ", orb_nfeatures"
+            for row in conn.execute(f"SELECT {columns} FROM image_hashes"):
+                db_uuid, phash, blob = row[:3]
+                if not phash or len(phash) != 16:
+                    continue  # 64-bit pHashes only, as generate_hashes.py makes
+                phashes.append(int(phash, 16))
+                self.uuids.append(db_uuid)
+                self.descriptors.append(
+                    np.frombuffer(blob, dtype=np.uint8).reshape(-1, 32)
+                    if blob
+                    else None
+                )
+                if has_nfeatures and row[3]:
+                    nfeatures.add(row[3])
+        finally:
+            conn.close()
+        self.phashes = np.array(phashes, dtype=np.uint64)
+        # Describe the photo with as many features as the cards were.
+        self.nfeatures = max(nfeatures) if nfeatures else _DEFAULT_NFEATURES
+
+    def nearest(self, phash: int, k: int) -> list:
+        """The k cards with the nearest pHashes, as (distance, card index)."""
+        k = min(k, len(self.uuids))
+        if k == 0:
+            return []
+        xor = (self.phashes ^ np.uint64(phash)).view(np.uint8)
+        distances = _POPCOUNT[xor].reshape(-1, 8).sum(axis=1)
+        nearest = np.argpartition(distances, k - 1)[:k]
+        return sorted(zip(distances[nearest].tolist(), nearest.tolist()))
+
+
+_index = None
+_index_lock = threading.Lock()
+# ORB detectors and matchers are not thread-safe; routes run in a thread pool.
+_local = threading.local()
+
+
+def _get_index() -> _Index:
+    global _index
+    if cv2 is None:
+        raise IdentifyUnavailable("imagehash/opencv are not installed")
+    try:
+        mtime_ns = HASHES_DB.stat().st_mtime_ns
+    except OSError:
+        raise IdentifyUnavailable("card_hashes.db has not been built") from None
+    index = _index
+    if index is None or index.mtime_ns != mtime_ns:
+        with _index_lock:
+            if _index is None or _index.mtime_ns != mtime_ns:
+                _index = _Index(HASHES_DB)
+            index = _index
+    return index
+
+
+def _orb_tools(nfeatures: int):
+    if getattr(_local, "nfeatures", None) != nfeatures:
+        _local.nfeatures = nfeatures
+        _local.orb = cv2.ORB_create(nfeatures=nfeatures)
+        _local.matcher = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=False)
+    return _local.orb, _local.matcher
+
+
+def open_photo(source) -> Image.Image:
+    """Open an image (bytes or a path), reading only its header.
+
+    Raises PhotoTooLarge past MAX_PIXELS, ValueError if it is not an image.
+    """
+    try:
+        img = Image.open(io.BytesIO(source) if isinstance(source, bytes) else source)
+    except Exception:
+        raise ValueError("not a readable image") from None
+    width, height = img.size
+    if width * height > MAX_PIXELS:
+        img.close()
+        raise PhotoTooLarge(f"{width}x{height} is over {MAX_PIXELS:,} pixels")
+    return img
+
+
+def _load_photo(source) -> Image.Image:
+    """An image (bytes or a path) as grayscale, at most _MAX_SIDE px on its
+    longest side.
+
+    pHash and ORB both work on grayscale. A JPEG decodes straight to gray at
+    a fraction of its size (draft), which is most of the cost of a large
+    photo; reduce() then box-filters it the rest of the way down, far cheaper
+    than a resampling resize.
+    """
+    img = open_photo(source)
+    try:
+        img.draft("L", (_MAX_SIDE, _MAX_SIDE))
+        img = img.convert("L")
+    except Exception:
+        raise ValueError("not a readable image") from None
+    factor = -(-max(img.size) // _MAX_SIDE)
+    if factor > 1:
+        img = img.reduce(factor)
+    return img
+
+
+def _good_matches(matcher, query, train) -> int:
+    try:
+        matches = matcher.knnMatch(query, train, k=2)
+    except cv2.error:
+        return 0
+    return sum(
+        1
+        for pair in matches
+        if len(pair) == 2 and pair[0].distance < _RATIO * pair[1].distance
+    )
+
+
+def _phash(img: Image.Image) -> int:
+    return int(str(imagehash.phash(img)), 16)
+
+
+def photo_phash(source) -> int:
+    """The 64-bit pHash of an image (bytes or a path), as card_hashes.db has
+    them for card images.
+
+    Raises IdentifyUnavailable without imagehash, ValueError if `source` is
+    not an image (PhotoTooLarge if it is too large to decode).
+    """
+    if imagehash is None:
+        raise IdentifyUnavailable("imagehash/opencv are not installed")
+    return _phash(_load_photo(source))
+
+
+def nearest_cards(phash: int, k: int = 1) -> list:
+    """The k card images with the nearest pHashes, as (distance, db_uuid)."""
+    index = _get_index()
+    return [(d, index.uuids[i]) for d, i in index.nearest(phash, k)]
+
+
+def identify(data: bytes, limit: int = 5) -> list:
+    """Rank the cards most like the photo in `data`, best first.
+
+    Raises IdentifyUnavailable if there is no index to search, ValueError if
+    `data` is not an image (PhotoTooLarge if it is too large to decode).
+    """
+    index = _get_index()
+    img = _load_photo(data)
+    phash = _phash(img)
+    candidates = index.nearest(phash, max(CANDIDATES, limit))
+
+    orb, matcher = _orb_tools(index.nfeatures)
+    _, query = orb.detectAndCompute(np.asarray(img), None)
+    band = candidates[0][0] + _PHASH_BAND if candidates else 0
+    ranked = []
+    for distance, i in candidates:
+        train = index.descriptors[i]
+        score = 0
+        if query is not None and train is not None:
+            score = _good_matches(matcher, query, train)
+        if distance <= band:
+            key = (0, -score, distance)
+        else:
+            key = (1, distance, -score)
+        ranked.append((key, index.uuids[i], score, distance))
+    ranked.sort()
+    return [
+        {"db_uuid": db_uuid, "orb_score": score, "phash_distance": distance}
+        for _, db_uuid, score, distance in ranked[:limit]
+    ]
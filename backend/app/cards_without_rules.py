@@ -9,15 +9,14 @@ cards_without_rules.py
 import sys
 import argparse
 import logging
-import yaml
+from card_catalog import read_cards
 
 __version__ = "%(prog)s 1.0.0 (Rel: 04 Sep 2025)"
 default_log_format = "%(filename)s:%(levelname)s:%(asctime)s] %(message)s"
 
 
 def read_yaml(path: str):
-    with open(path) as f:
-        return yaml.safe_load(f)
+    return read_cards(path)
 
 
 def main(argv):
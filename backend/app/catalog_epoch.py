@@ -0,0 +1,40 @@
+"""
+@copyright Copyright 2025, Brandon Arrendondo
+See LICENSE.txt for details.
+
+Catalog epoch: how deploy scripts tell running API workers the card tables
+changed underneath them.
+
+Anything the API derives from the whole catalog and keeps in memory (the
+sitemap, say) remembers the epoch it was built at and rebuilds when
+catalog_epoch() moves. Everything that writes the card tables bumps it after
+it commits: create_db.py, every load_cards_from_yaml.py mode (except --bulk
+into a shadow schema) and catalog_swap.py. Same mechanism as rib_security's auth epoch: the
+mtime of a file, so checking it is a stat, not a query.
+
+Config via env:
+  SRG_CATALOG_EPOCH_FILE  path of the epoch file (default: app/.catalog_epoch)
+"""
+
+import os
+from pathlib import Path
+
+CATALOG_EPOCH_FILE = Path(
+    os.environ.get(
+        "SRG_CATALOG_EPOCH_FILE",
+        str(Path(__file__).resolve().parent / ".catalog_epoch"),
+    )
+)
+
+
+def catalog_epoch() -> int:
+    """Current catalog epoch (the file's mtime_ns; 0 if never bumped)."""
+    try:
+        return CATALOG_EPOCH_FILE.stat().st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+
+def bump_catalog_epoch() -> None:
+    """Tell running API workers to rebuild what they cached from the catalog."""
+    CATALOG_EPOCH_FILE.touch()
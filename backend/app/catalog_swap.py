@@ -0,0 +1,244 @@
+"""
+@copyright Copyright 2025, Brandon Arrendondo
+See LICENSE.txt for details.
+
+Blue/green rebuild of the card catalog.
+
+create_db.py + a reload rebuild the card tables in place, so for the length of
+the load the site serves an empty or half-filled catalog. This instead builds
+the new catalog off to the side and swaps it in atomically:
+
+  prepare   (re)create the shadow schema `cards_next` with empty card tables
+  load      bulk-load cards.yaml into it (load_cards_from_yaml --bulk --schema)
+  validate  row counts and subclass/type consistency of the shadow copy
+  swap      in ONE transaction: move the live card tables (and their enum
+            types) into `cards_prev`, and the shadow ones into `public`
+  rollback  trade `cards_prev` and `public` (so a second rollback undoes
+            the first)
+
+Postgres DDL is transactional, so readers see either the old catalog or the
+new one, never a mix; they wait only for the brief table locks of the swap.
+Only models.base.CATALOG_TABLES move — shared lists and the Run It Back tables
+stay where they are and need no backup/restore. After a swap or rollback the
+catalog epoch is bumped so API workers drop anything cached from the old one.
+
+Usage (from backend/app):
+    python catalog_swap.py rebuild [cards.yaml]  # prepare, load, validate, swap
+    python catalog_swap.py rollback
+"""
+
+import argparse
+import sys
+
+from sqlalchemy import Enum, inspect, text
+
+from catalog_epoch import bump_catalog_epoch
+from database import engine
+from load_cards_from_yaml import load_cards_bulk
+from models.base import CATALOG_TABLES, Base, CardType
+
+LIVE = "public"
+SHADOW = "cards_next"
+PREVIOUS = "cards_prev"
+# Where the live tables wait while the incoming ones move in.
+_STAGING = "cards_swap"
+
+# Refuse to swap in a catalog that lost more than this share of the live cards;
+# that is a truncated cards.yaml, not a deploy. --force overrides.
+_MAX_SHRINK = 0.10
+
+
+def _enum_types() -> list[str]:
+    """Postgres enum types the catalog tables use (they move with the tables)."""
+    names = {
+        c.type.name
+        for t in CATALOG_TABLES
+        for c in t.columns
+        if isinstance(c.type, Enum) and c.type.name
+    }
+    return sorted(names)
+
+
+def prepare():
+    """Drop and recreate the shadow schema with empty catalog tables."""
+    with engine.begin() as conn:
+        # On a first deploy the tables that live beside the catalog (shared
+        # lists, Run It Back) don't exist yet; nothing in them references it.
+        others = [t for t in Base.metadata.sorted_tables if t not in CATALOG_TABLES]
+        Base.metadata.create_all(conn, tables=others)
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SHADOW} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SHADOW}"))
+        shadow = conn.execution_options(schema_translate_map={None: SHADOW})
+        Base.metadata.create_all(shadow, tables=CATALOG_TABLES)
+    print(f"Prepared empty catalog tables in schema {SHADOW}.")
+
+
+def _count(conn, schema: str, table: str, where: str = "") -> int:
+    return conn.execute(text(f"SELECT count(*) FROM {schema}.{table} {where}")).scalar()
+
+
+def validate(schema: str = SHADOW, force: bool = False) -> list[str]:
+    """Sanity-check a catalog copy before it goes live; returns the problems.
+
+    Foreign keys already guarantee the junctions point at real cards. What they
+    can't express is the joined-inheritance shape: every cards row must have
+    exactly its subclass row, and the competitor tables must add up.
+    """
+    problems = []
+    leaf_tables = {
+        CardType.main_deck.value: "main_deck_cards",
+        CardType.single_competitor.value: "single_competitor_cards",
+        CardType.tornado_competitor.value: "tornado_competitor_cards",
+        CardType.trio_competitor.value: "trio_competitor_cards",
+        CardType.entrance.value: "entrance_cards",
+        CardType.spectacle.value: "spectacle_cards",
+        CardType.crowd_meter.value: "crowd_meter_cards",
+    }
+    with engine.connect() as conn:
+        total = _count(conn, schema, "cards")
+        if total == 0:
+            problems.append(f"{schema}.cards is empty")
+        for card_type, table in leaf_tables.items():
+            typed = _count(conn, schema, "cards", f"WHERE card_type = '{card_type}'")
+            rows = _count(conn, schema, table)
+            if typed != rows:
+                problems.append(
+                    f"{schema}.{table} has {rows} rows but {typed} cards are {card_type}"
+                )
+        competitors = _count(conn, schema, "competitor_cards")
+        leaves = sum(
+            _count(conn, schema, t)
+            for t in (
+                "single_competitor_cards",
+                "tornado_competitor_cards",
+                "trio_competitor_cards",
+            )
+        )
+        if competitors != leaves:
+            problems.append(
+                f"{schema}.competitor_cards has {competitors} rows, "
+                f"its subclasses {leaves}"
+            )
+        live = 0
+        if schema != LIVE and inspect(conn).has_table("cards", schema=LIVE):
+            live = _count(conn, LIVE, "cards")
+    if not force and live and total < live * (1 - _MAX_SHRINK):
+        problems.append(
+            f"{schema} has {total} cards against {live} live; pass --force if intended"
+        )
+    return problems
+
+
+def _present(conn, schema: str, tables: list, types: list):
+    """The catalog tables and enum types that exist in `schema`."""
+    have_tables = conn.execute(
+        text(
+            "SELECT table_name FROM information_schema.tables "
+            "WHERE table_schema = :s AND table_name = ANY(:t)"
+        ),
+        {"s": schema, "t": tables},
+    ).scalars()
+    have_types = conn.execute(
+        text(
+            "SELECT t.typname FROM pg_type t "
+            "JOIN pg_namespace n ON n.oid = t.typnamespace "
+            "WHERE n.nspname = :s AND t.typname = ANY(:t)"
+        ),
+        {"s": schema, "t": types},
+    ).scalars()
+    have_tables, have_types = set(have_tables), set(have_types)
+    return (
+        [t for t in tables if t in have_tables],
+        [t for t in types if t in have_types],
+    )
+
+
+def _move(conn, tables, types, source: str, target: str):
+    for name in tables:
+        conn.execute(text(f"ALTER TABLE {source}.{name} SET SCHEMA {target}"))
+    for name in types:
+        conn.execute(text(f"ALTER TYPE {source}.{name} SET SCHEMA {target}"))
+
+
+def _exchange(incoming: str, outgoing: str):
+    """Atomically make `incoming` the live catalog and keep the old one in
+    `outgoing` (which may be the same schema: rollback just trades places).
+
+    On a first deploy there is no live catalog; `incoming` simply moves in.
+    """
+    tables = [t.name for t in CATALOG_TABLES]
+    types = _enum_types()
+    with engine.begin() as conn:
+        new_tables, new_types = _present(conn, incoming, tables, types)
+        if len(new_tables) != len(tables):
+            raise SystemExit(f"Schema {incoming} does not hold a full catalog.")
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {_STAGING} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {_STAGING}"))
+        _move(conn, *_present(conn, LIVE, tables, types), LIVE, _STAGING)
+        _move(conn, new_tables, new_types, incoming, LIVE)
+        # Whatever else create_all left in the incoming schema (unused enum
+        # types) goes with it.
+        conn.execute(text(f"DROP SCHEMA {incoming} CASCADE"))
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {outgoing} CASCADE"))
+        conn.execute(text(f"ALTER SCHEMA {_STAGING} RENAME TO {outgoing}"))
+    bump_catalog_epoch()
+
+
+def swap(force: bool = False) -> int:
+    problems = validate(SHADOW, force=force)
+    if problems:
+        print("Not swapping; the shadow catalog failed validation:", file=sys.stderr)
+        for p in problems:
+            print(f"  - {p}", file=sys.stderr)
+        return 1
+    _exchange(incoming=SHADOW, outgoing=PREVIOUS)
+    print(f"Swapped {SHADOW} live; the previous catalog is kept in {PREVIOUS}.")
+    return 0
+
+
+def rollback() -> int:
+    _exchange(incoming=PREVIOUS, outgoing=PREVIOUS)
+    print(f"Swapped {PREVIOUS} live; the replaced catalog is now in {PREVIOUS}.")
+    return 0
+
+
+def rebuild(input_path: str, output_path: str, force: bool = False, data=None) -> int:
+    """Prepare, bulk-load `input_path` (or the already-parsed `data`) into the
+    shadow schema, validate and swap it live."""
+    prepare()
+    load_cards_bulk(input_path, output_path, schema=SHADOW, data=data)
+    return swap(force=force)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Blue/green card catalog swap.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rebuild_p = sub.add_parser("rebuild", help="prepare, load, validate and swap")
+    rebuild_p.add_argument("input", nargs="?", default="cards.yaml")
+    rebuild_p.add_argument("output", nargs="?", default="augmented_cards.yaml")
+    rebuild_p.add_argument("--force", action="store_true")
+    sub.add_parser("prepare", help="recreate the empty shadow schema")
+    validate_p = sub.add_parser("validate", help="check the shadow catalog")
+    validate_p.add_argument("--force", action="store_true")
+    swap_p = sub.add_parser("swap", help="validate the shadow catalog, swap it live")
+    swap_p.add_argument("--force", action="store_true")
+    sub.add_parser("rollback", help="swap the previous catalog back in")
+    args = parser.parse_args(argv)
+
+    if args.command == "prepare":
+        prepare()
+        return 0
+    if args.command == "validate":
+        problems = validate(SHADOW, force=args.force)
+        for p in problems:
+            print(f"  - {p}")
+        return 1 if problems else 0
+    if args.command == "swap":
+        return swap(force=args.force)
+    if args.command == "rollback":
+        return rollback()
+    return rebuild(args.input, args.output, force=args.force)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -9,7 +9,7 @@ competitor_card_completeness.py
 import sys
 import argparse
 import logging
-import yaml
+from card_catalog import read_cards
 
 __version__ = "%(prog)s 1.0.0 (Rel: 11 Dec 2025)"
 default_log_format = "%(filename)s:%(levelname)s:%(asctime)s] %(message)s"
@@ -22,8 +22,7 @@ COMPETITOR_CARD_TYPES = [
 
 
 def read_yaml(path: str):
-    with open(path) as f:
-        return yaml.safe_load(f)
+    return read_cards(path)
 
 
 def analyze_competitor_cards(cards_data):
@@ -5,8 +5,9 @@ See LICENSE.txt for details.
 Rebuild the card-search schema from scratch.
 
 This DROPS AND RECREATES every table whose contents are derived from
-cards.yaml, which is the source of truth — that is the whole point, and it is
-what workflow.sh runs on each deploy.
+cards.yaml, which is the source of truth — that is the whole point. Routine
+deploys don't need it (workflow.sh runs `load_cards_from_yaml.py --sync`); it
+is the fallback for a first deploy or a card-table schema change.
 
 It deliberately does NOT touch the Run It Back tables (see models.base
 .RIB_MODELS): accounts, decks and saved games are original data that nothing
@@ -18,6 +19,7 @@ from models.base import (  # noqa: F401  (importing Base pulls in every model)
     Base,
 )
 from sqlalchemy_utils import database_exists, create_database
+from catalog_epoch import bump_catalog_epoch
 from database import engine
 
 PRESERVED = {m.__tablename__ for m in RIB_MODELS}
@@ -54,6 +56,8 @@ def main():
     print(f"Dropping and recreating {len(tables)} card-search tables...")
     Base.metadata.drop_all(engine, tables=tables)
     Base.metadata.create_all(engine, tables=tables)
+    # Running API workers must drop what they cached from the old tables.
+    bump_catalog_epoch()
     print("Done.")
 
 
@@ -2,14 +2,34 @@
 """
 Create mobile-app compatible SQLite database from cards.yaml
 Uses single-table schema matching Android Room database format
+
+Room validates a pre-packaged database against its entities, so everything
+here must be exactly what Room would create itself. By default that means no
+indexes: the app's entities declare none, and Room creates its own.
+
+SRG_MOBILE_SEARCH_INDEXES=on adds the search structures of create_search_indexes:
+  - `index_cards_<column>` for each CARD_INDEX_COLUMNS column, i.e. the Card
+    entity declares `indices = [Index("card_type"), ...]` for the same columns
+  - `cards_fts`, an FTS4 table over cards (FTS_COLUMNS) with Room's content
+    sync triggers, i.e. an `@Fts4(contentEntity = Card::class)` entity with
+    those columns. FTS4 rather than FTS5: Room only supports FTS3/4, and FTS5
+    is not in every Android build's SQLite.
+Every app version still downloading the database fails Room's schema check on
+them until it declares those entities, so only turn this on once the app
+release that does is the oldest one supported.
+
+Config via env:
+  SRG_MOBILE_SEARCH_INDEXES  'on' to build the indexes and FTS table (default: off)
 """
 
+import os
 import sqlite3
 import sys
-import yaml
 import uuid as uuid_module
 from pathlib import Path
 
+from card_catalog import read_cards
+
 
 def create_mobile_schema(conn):
     """Create complete schema matching Android Room database."""
@@ -112,7 +132,8 @@ def create_mobile_schema(conn):
         )
     """)
 
-    # Note: Room will create indexes itself, don't create them here
+    # Note: any indexes and the FTS table are added after the data is loaded
+    # (create_search_indexes, when enabled); they must match the Room entities.
 
     # Insert default folders
     timestamp = int(1000 * 1700000000)  # Fixed timestamp
@@ -131,6 +152,84 @@ def create_mobile_schema(conn):
     print("Schema created successfully with default folders")
 
 
+# Filter/sort columns of the card browser; each gets the index Room names
+# `index_cards_<column>` for `Index("<column>")` on the Card entity.
+CARD_INDEX_COLUMNS = (
+    "name",
+    "card_type",
+    "deck_card_number",
+    "atk_type",
+    "play_order",
+    "division",
+    "power",
+    "agility",
+    "strike",
+    "submission",
+    "grapple",
+    "technique",
+)
+
+FTS_TABLE = "cards_fts"
+FTS_COLUMNS = ("name", "rules_text", "errata_text", "tags")
+
+
+def search_indexes_enabled() -> bool:
+    return os.environ.get("SRG_MOBILE_SEARCH_INDEXES", "").lower() in ("on", "1", "yes")
+
+
+def create_search_indexes(conn):
+    """Add the card indexes and the full-text table, in Room's own DDL.
+
+    Run after the cards are loaded: one index build beats maintaining the
+    indexes row by row, and the FTS table is filled afterwards by
+    rebuild_search_index.
+    """
+    cursor = conn.cursor()
+    for column in CARD_INDEX_COLUMNS:
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS `index_cards_{column}` ON `cards` (`{column}`)"
+        )
+
+    columns = ", ".join(f"`{c}` TEXT" for c in FTS_COLUMNS)
+    cursor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS `{FTS_TABLE}` "
+        f"USING FTS4({columns}, content=`cards`)"
+    )
+    # An external-content FTS table only sees changes through triggers; these
+    # are the ones Room creates for a contentEntity, so rows the app syncs into
+    # cards later stay searchable.
+    names = ", ".join(f"`{c}`" for c in FTS_COLUMNS)
+    new_values = ", ".join(f"NEW.`{c}`" for c in FTS_COLUMNS)
+    delete = f"DELETE FROM `{FTS_TABLE}` WHERE `docid`=OLD.`rowid`;"
+    insert = (
+        f"INSERT INTO `{FTS_TABLE}`(`docid`, {names}) "
+        f"VALUES (NEW.`rowid`, {new_values});"
+    )
+    for when, action in (
+        ("BEFORE UPDATE", delete),
+        ("BEFORE DELETE", delete),
+        ("AFTER UPDATE", insert),
+        ("AFTER INSERT", insert),
+    ):
+        trigger = f"room_fts_content_sync_{FTS_TABLE}_{when.replace(' ', '_')}"
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {trigger} {when} ON `cards` "
+            f"BEGIN {action} END"
+        )
+    conn.commit()
+
+
+def rebuild_search_index(conn):
+    """(Re)fill the FTS table from cards and merge it into one segment.
+
+    The FTS table refers to cards by rowid, and VACUUM may renumber the rowids
+    of a table without an INTEGER PRIMARY KEY, so this runs after it.
+    """
+    conn.execute(f"INSERT INTO `{FTS_TABLE}`(`{FTS_TABLE}`) VALUES ('rebuild')")
+    conn.execute(f"INSERT INTO `{FTS_TABLE}`(`{FTS_TABLE}`) VALUES ('optimize')")
+    conn.commit()
+
+
 def normalize_tags(tags):
     """Normalize tags to comma-separated string."""
     if not tags:
@@ -142,58 +241,71 @@ def normalize_tags(tags):
     return str(tags)
 
 
-def insert_card(cursor, entry, sync_time):
-    """Insert card into single-table format."""
-    cursor.execute(
-        """
-        INSERT OR REPLACE INTO cards (
-            db_uuid, name, card_type, rules_text, errata_text,
-            is_banned, release_set, srg_url, srgpc_url, comments, tags,
-            power, agility, strike, submission, grapple, technique,
-            division, gender, deck_card_number, atk_type, play_order,
-            synced_at
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """,
-        (
-            entry["db_uuid"],
-            entry["name"],
-            entry.get("card_type"),
-            # Mobile keeps the legacy `rules_text` column; source it from the verbatim
-            # `card_text` (the field was renamed rules_text -> card_text) for compat.
-            entry.get("card_text"),
-            entry.get("errata_text"),
-            1 if entry.get("is_banned") else 0,
-            entry.get("release_set"),
-            entry.get("srg_url"),
-            entry.get("srgpc_url"),
-            entry.get("comments"),
-            normalize_tags(entry.get("tags")),
-            entry.get("power"),
-            entry.get("agility"),
-            entry.get("strike"),
-            entry.get("submission"),
-            entry.get("grapple"),
-            entry.get("technique"),
-            entry.get("division"),
-            entry.get("gender"),
-            entry.get("deck_card_number"),
-            entry.get("atk_type"),
-            entry.get("play_order"),
-            sync_time,
-        ),
+_INSERT_CARD = """
+    INSERT OR REPLACE INTO cards (
+        db_uuid, name, card_type, rules_text, errata_text,
+        is_banned, release_set, srg_url, srgpc_url, comments, tags,
+        power, agility, strike, submission, grapple, technique,
+        division, gender, deck_card_number, atk_type, play_order,
+        synced_at
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Pinned rather than left to the SQLite build, so the same input always gives
+# the same file (db_manifest.json's hash is how phones decide to re-download).
+_PAGE_SIZE = 4096
+
+
+def card_row(entry, sync_time):
+    """One cards-table row, in _INSERT_CARD's column order."""
+    return (
+        entry["db_uuid"],
+        entry["name"],
+        entry.get("card_type"),
+        # Mobile keeps the legacy `rules_text` column; source it from the verbatim
+        # `card_text` (the field was renamed rules_text -> card_text) for compat.
+        entry.get("card_text"),
+        entry.get("errata_text"),
+        1 if entry.get("is_banned") else 0,
+        entry.get("release_set"),
+        entry.get("srg_url"),
+        entry.get("srgpc_url"),
+        entry.get("comments"),
+        normalize_tags(entry.get("tags")),
+        entry.get("power"),
+        entry.get("agility"),
+        entry.get("strike"),
+        entry.get("submission"),
+        entry.get("grapple"),
+        entry.get("technique"),
+        entry.get("division"),
+        entry.get("gender"),
+        entry.get("deck_card_number"),
+        entry.get("atk_type"),
+        entry.get("play_order"),
+        sync_time,
     )
 
 
-def load_cards_from_yaml(conn, yaml_path):
-    """Load cards from YAML into mobile database."""
-    print(f"\nLoading cards from {yaml_path}...")
+def _link_rows(cards, key):
+    """Sorted, de-duplicated (card_uuid, other_uuid) pairs from each card's `key`."""
+    return sorted({(e["db_uuid"], other) for e in cards for other in e.get(key) or []})
+
+
+def load_cards_from_yaml(conn, yaml_path, cards=None):
+    """Load cards from YAML into mobile database.
 
-    with open(yaml_path) as f:
-        cards = yaml.safe_load(f)
+    `cards` is an already-parsed cards.yaml (deploy_pipeline.py), used instead
+    of reading `yaml_path`. Returns the row counts generate_db_manifest.py
+    records, or None if there was nothing to load.
+    """
+    if cards is None:
+        print(f"\nLoading cards from {yaml_path}...")
+        cards = read_cards(yaml_path)
 
     if not cards:
         print("[ERROR] No cards found in YAML file")
-        return
+        return None
 
     print(f"Found {len(cards)} cards in YAML")
 
@@ -206,67 +318,90 @@ def load_cards_from_yaml(conn, yaml_path):
             entry["db_uuid"] = uuid_module.uuid4().hex
             print(f"[NEW] Generated UUID for '{entry.get('name')}'")
 
-    # Insert all cards
-    print("\nInserting cards...")
-    for i, entry in enumerate(cards, 1):
-        insert_card(cursor, entry, sync_time)
-        if i % 100 == 0:
-            print(f"  Progress: {i}/{len(cards)}")
-
-    conn.commit()
-    print(f"Loaded {len(cards)} cards")
-
-    # Insert related finishes
-    print("\nInserting related finishes...")
-    finish_count = 0
-    for entry in cards:
-        card_uuid = entry["db_uuid"]
-        related_finishes = entry.get("related_finishes", [])
-        if related_finishes:
-            for finish_uuid in related_finishes:
-                cursor.execute(
-                    "INSERT OR IGNORE INTO card_related_finishes (card_uuid, finish_uuid) VALUES (?, ?)",
-                    (card_uuid, finish_uuid),
-                )
-                finish_count += 1
-
-    conn.commit()
-    print(f"Loaded {finish_count} related finish links")
-
-    # Insert related cards
-    print("\nInserting related cards...")
-    related_count = 0
-    for entry in cards:
-        card_uuid = entry["db_uuid"]
-        related_cards = entry.get("related_cards", [])
-        if related_cards:
-            for related_uuid in related_cards:
-                cursor.execute(
-                    "INSERT OR IGNORE INTO card_related_cards (card_uuid, related_uuid) VALUES (?, ?)",
-                    (card_uuid, related_uuid),
-                )
-                related_count += 1
-
+    # Rows go in by uuid, not cards.yaml order, so reordering the YAML doesn't
+    # change the file. The sort is stable: a duplicated uuid still ends up as
+    # the entry listed last, as with one INSERT OR REPLACE per card.
+    ordered = sorted(cards, key=lambda e: e["db_uuid"])
+    cursor.executemany(_INSERT_CARD, [card_row(e, sync_time) for e in ordered])
+
+    finish_rows = _link_rows(cards, "related_finishes")
+    cursor.executemany(
+        "INSERT OR IGNORE INTO card_related_finishes (card_uuid, finish_uuid) "
+        "VALUES (?, ?)",
+        finish_rows,
+    )
+    related_rows = _link_rows(cards, "related_cards")
+    cursor.executemany(
+        "INSERT OR IGNORE INTO card_related_cards (card_uuid, related_uuid) "
+        "VALUES (?, ?)",
+        related_rows,
+    )
     conn.commit()
-    print(f"Loaded {related_count} related card links")
 
     print(
-        f"\n[SUCCESS] Database complete: {len(cards)} cards, {finish_count} finish links, {related_count} related links"
+        f"\n[SUCCESS] Database complete: {len(cards)} cards, "
+        f"{len(finish_rows)} finish links, {len(related_rows)} related links"
     )
+    return count_rows(conn)
+
+
+def count_rows(conn):
+    """Row counts of the card tables, as the db manifest reports them."""
+    cursor = conn.cursor()
+    return {
+        "card_count": cursor.execute("SELECT COUNT(*) FROM cards").fetchone()[0],
+        "related_finishes_count": cursor.execute(
+            "SELECT COUNT(*) FROM card_related_finishes"
+        ).fetchone()[0],
+        "related_cards_count": cursor.execute(
+            "SELECT COUNT(*) FROM card_related_cards"
+        ).fetchone()[0],
+    }
+
+
+def create_mobile_db(db_path, yaml_path, cards=None):
+    """(Re)build the mobile database at `db_path`; returns count_rows' stats.
+
+    The database is built from scratch in a scratch file next to `db_path` and
+    moved over it only once complete, so a failed build leaves the previous
+    database in place. Nothing can read the scratch file meanwhile, so it is
+    built with journaling and fsyncs off, then VACUUMed (pages are laid out
+    afresh, and identical input gives a byte-identical file), given its search
+    index if enabled, and ANALYZEd.
+    """
+    db_path = Path(db_path)
+    scratch = db_path.with_name(db_path.name + ".building")
+    scratch.unlink(missing_ok=True)
+    conn = sqlite3.connect(scratch)
+    try:
+        conn.execute(f"PRAGMA page_size = {_PAGE_SIZE}")
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        create_mobile_schema(conn)
+        stats = load_cards_from_yaml(conn, yaml_path, cards)
+        if stats is not None:
+            indexed = search_indexes_enabled()
+            if indexed:
+                create_search_indexes(conn)
+            conn.execute("VACUUM")
+            if indexed:
+                rebuild_search_index(conn)
+            conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    if stats is None:
+        scratch.unlink()
+        return None
+    os.replace(scratch, db_path)
+    return stats
 
 
 if __name__ == "__main__":
     db_path = sys.argv[1] if len(sys.argv) > 1 else "srg_cards_mobile.db"
     yaml_path = sys.argv[2] if len(sys.argv) > 2 else "cards.yaml"
 
-    # Create database
-    conn = sqlite3.connect(db_path)
-    create_mobile_schema(conn)
-
-    # Load data
     if Path(yaml_path).exists():
-        load_cards_from_yaml(conn, yaml_path)
-        conn.close()
+        create_mobile_db(db_path, yaml_path)
         print(f"\nDatabase saved to: {db_path}")
     else:
         print(f"\n[ERROR] YAML file not found: {yaml_path}")
@@ -6,20 +6,31 @@ Additively create the "Run It Back" tables (rib_users, rib_decks, ...).
 
 Unlike create_db.py, this script NEVER drops anything. It calls
 create_all(..., checkfirst=True) against only the RIB tables, then adds any
-nullable column a live table is missing, so it is safe to run against the live
-production database — existing tables (cards, shared_lists, ...) are untouched,
-and tables that already exist keep their rows.
+nullable column or index a live table is missing, so it is safe to run against
+the live production database — existing tables (cards, shared_lists, ...) are
+untouched, and tables that already exist keep their rows.
 
 workflow.sh runs this on every deploy: the first one creates the tables, later
-ones are a no-op unless a model gained a column.
+ones are a no-op unless a model gained a column or an index (or a game record
+still lacks its frame_count).
 
 Run from inside backend/app:  python create_rib_tables.py
+Backfill compressed game payloads:  python create_rib_tables.py --compress-records
 """
 
-from sqlalchemy import inspect, text
+import argparse
 
-from database import engine
-from models.base import RIB_MODELS, Base
+from sqlalchemy import inspect, or_, text
+
+from database import SessionLocal, engine
+from models.base import RIB_MODELS, Base, GameRecord
+from record_storage import (
+    FORMAT_CHUNKED,
+    compression_enabled,
+    count_frames,
+    load_payload,
+    store_payload,
+)
 
 # Only the RIB tables, from the one list that also tells create_db.py what NOT
 # to drop — so the two scripts can never disagree about which tables hold user
@@ -56,13 +67,170 @@ def add_missing_columns(connection):
             )
 
 
-def main():
+def _invalid_indexes(connection) -> set:
+    """Indexes a failed CREATE INDEX CONCURRENTLY left behind (Postgres)."""
+    rows = connection.execute(
+        text(
+            "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE NOT i.indisvalid"
+        )
+    )
+    return {name for (name,) in rows}
+
+
+def add_missing_indexes(connection):
+    """CREATE INDEX for model indexes a live table lacks.
+
+    Same gap as add_missing_columns: create_all skips existing tables, and with
+    them any index declared after the first deploy. Indexes are purely additive,
+    so creating the missing ones is always safe.
+
+    On Postgres they are built CONCURRENTLY, so the live tables (the game
+    records above all) keep taking writes meanwhile; that can't run in a
+    transaction, so `connection` must be in AUTOCOMMIT. A concurrent build that
+    failed leaves an invalid index behind, which is dropped and built again.
+    """
+    postgres = connection.dialect.name == "postgresql"
+    invalid = _invalid_indexes(connection) if postgres else set()
+    inspector = inspect(connection)
+    for table in RIB_TABLES:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {i["name"] for i in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in invalid:
+                print(f"  DROP invalid index {index.name} on {table.name}")
+                connection.execute(text(f'DROP INDEX CONCURRENTLY "{index.name}"'))
+            elif index.name in existing:
+                continue
+            print(f"  ADD  index {index.name} on {table.name}")
+            if postgres:
+                index.dialect_kwargs["postgresql_concurrently"] = True
+            index.create(connection)
+
+
+# Already zstd-compressed; Postgres trying to pglz them again on TOAST is
+# wasted work, so store them out of line but uncompressed.
+PRECOMPRESSED_COLUMNS = [
+    (GameRecord.__tablename__, "snapshot_z"),
+    (GameRecord.__tablename__, "frames_z"),
+    ("rib_game_record_frame_chunks", "frames_z"),
+]
+
+
+def tune_precompressed_storage(connection):
+    """SET STORAGE EXTERNAL on the precompressed columns that lack it.
+
+    Each column's current strategy is read from pg_attribute first, so a run
+    with nothing to change takes no lock on the tables.
+    """
+    for table, column in PRECOMPRESSED_COLUMNS:
+        storage = connection.execute(
+            text(
+                "SELECT attstorage FROM pg_attribute "
+                "WHERE attrelid = to_regclass(:table) AND attname = :column "
+                "AND NOT attisdropped"
+            ),
+            {"table": table, "column": column},
+        ).scalar()
+        if storage is None or storage == "e":  # no such column yet, or done
+            continue
+        print(f"  SET  {table}.{column} STORAGE EXTERNAL")
+        connection.execute(
+            text(f'ALTER TABLE {table} ALTER COLUMN "{column}" SET STORAGE EXTERNAL')
+        )
+
+
+def backfill_frame_counts(batch_size=100):
+    """Set frame_count on records written before every format kept it.
+
+    Each such record is inflated once here so that responses never have to;
+    afterwards the query finds nothing and this is a no-op.
+    """
+    total = 0
+    db = SessionLocal()
+    try:
+        while True:
+            batch = (
+                db.query(GameRecord)
+                .filter(GameRecord.frame_count.is_(None))
+                .order_by(GameRecord.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not batch:
+                break
+            for record in batch:
+                count_frames(record)
+            db.commit()
+            total += len(batch)
+    finally:
+        db.close()
+    print(f"  counted frames for {total} records")
+
+
+def compress_records(batch_size=100):
+    """Rewrite older-format game records into the current (chunked) format.
+
+    Optional and resumable: it only touches rows not yet in FORMAT_CHUNKED
+    (plain, or whole-array zstd), a batch per transaction, so it can be stopped and rerun at will.
+    Readers handle both formats, so the site stays up throughout.
+    """
+    if not compression_enabled():
+        print("  SKIP: zstandard is not installed or RIB_RECORD_COMPRESSION=off")
+        return
+    total = 0
+    db = SessionLocal()
+    try:
+        while True:
+            batch = (
+                db.query(GameRecord)
+                .filter(
+                    or_(
+                        GameRecord.payload_format.is_(None),
+                        GameRecord.payload_format != FORMAT_CHUNKED,
+                    )
+                )
+                .order_by(GameRecord.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not batch:
+                break
+            for record in batch:
+                store_payload(record, *load_payload(record))
+            db.commit()
+            total += len(batch)
+            print(f"  compressed {total} records")
+    finally:
+        db.close()
+    print(f"  {total} records now stored as {FORMAT_CHUNKED}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Additively ensure RIB tables.")
+    parser.add_argument(
+        "--compress-records",
+        action="store_true",
+        help="Also rewrite plain game records into the compressed payload format",
+    )
+    args = parser.parse_args(argv)
+
     names = ", ".join(t.name for t in RIB_TABLES)
     print(f"Ensuring RIB tables exist (checkfirst, no drop): {names}")
     Base.metadata.create_all(engine, tables=RIB_TABLES, checkfirst=True)
     print("Ensuring columns exist (additive only):")
     with engine.begin() as connection:
         add_missing_columns(connection)
+        tune_precompressed_storage(connection)
+    print("Ensuring indexes exist (additive only):")
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        add_missing_indexes(connection)
+    print("Backfilling frame counts:")
+    backfill_frame_counts()
+    if args.compress_records:
+        print("Compressing stored game records:")
+        compress_records()
     print("Done.")
 
 
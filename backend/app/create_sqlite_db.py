@@ -12,10 +12,11 @@ SQLite-specific adaptations:
 
 import sqlite3
 import sys
-import yaml
 import uuid as uuid_module
 from pathlib import Path
 
+from card_catalog import read_cards
+
 
 def create_database(db_path: str):
     """Create SQLite database with all tables for SRG card game."""
@@ -404,8 +405,7 @@ def load_cards_from_yaml(conn, yaml_path: str):
     """Load card data from YAML file into database."""
     print(f"\nLoading cards from {yaml_path}...")
 
-    with open(yaml_path) as f:
-        cards = yaml.safe_load(f)
+    cards = read_cards(yaml_path)
 
     if not cards:
         print("[ERROR] No cards found in YAML file")
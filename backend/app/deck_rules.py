@@ -0,0 +1,113 @@
+"""
+@copyright Copyright 2025, Brandon Arrendondo
+See LICENSE.txt for details.
+
+Catalog-backed deck checks that need no engine.
+
+rib_engine.deck_data_to_decklist only checks a deck's shape (a competitor, an
+entrance, 30 DECK slots). Everything else that can be decided from the card
+catalog alone is decided here, in-process, before `srg` is ever spawned:
+
+  - every uuid names a real card
+  - the competitor is a SingleCompetitorCard (no tornado/trio teams)
+  - the entrance is an EntranceCard
+  - every DECK slot is a MainDeckCard
+  - no two main-deck cards share a deck_card_number (a deck is #1..#30, once each)
+
+The catalog is read from the same cards.yaml the engine loads, so the two can
+never disagree about which cards exist. It is parsed once per process and
+re-read only when the file changes. Anything that needs the rules engine
+(finish requirements, banned cards, ...) is still the engine's call.
+"""
+
+import threading
+from pathlib import Path
+
+from card_catalog import read_cards
+
+_lock = threading.Lock()
+# (path, mtime_ns) the index was built from, and the index itself:
+# db_uuid -> (name, card_type, deck_card_number)
+_loaded = {"key": None, "index": {}}
+
+
+def _catalog(cards_path: Path) -> dict:
+    """Return the uuid index for `cards_path`, (re)building it if the file changed."""
+    key = (str(cards_path), cards_path.stat().st_mtime_ns)
+    with _lock:
+        if _loaded["key"] != key:
+            cards = read_cards(cards_path) or []
+            _loaded["index"] = {
+                c["db_uuid"]: (
+                    c.get("name", c["db_uuid"]),
+                    c.get("card_type"),
+                    c.get("deck_card_number"),
+                )
+                for c in cards
+                if c.get("db_uuid")
+            }
+            _loaded["key"] = key
+        return _loaded["index"]
+
+
+def _role_problem(index: dict, uuid: str, role: str, want: str):
+    card = index.get(uuid)
+    if card is None:
+        return f"Unknown {role} card {uuid}"
+    name, card_type, _ = card
+    if card_type == want:
+        return None
+    if role == "competitor" and card_type in (
+        "TornadoCompetitorCard",
+        "TrioCompetitorCard",
+    ):
+        return f"{name} is a tag-team competitor; only single competitors can play"
+    return f"{name} ({card_type}) can't be the {role}"
+
+
+def _main_deck_problems(index: dict, uuids: list) -> list:
+    problems = []
+    by_number = {}
+    for uuid in uuids:
+        card = index.get(uuid)
+        if card is None:
+            problems.append(f"Unknown deck card {uuid}")
+            continue
+        name, card_type, number = card
+        if card_type != "MainDeckCard":
+            problems.append(f"{name} ({card_type}) can't go in the main deck")
+            continue
+        by_number.setdefault(number, []).append(name)
+    for number in sorted(by_number, key=lambda n: (n is None, n)):
+        names = by_number[number]
+        if len(names) > 1:
+            problems.append(
+                f"Deck card #{number} is used {len(names)} times ({', '.join(names)})"
+            )
+    return problems
+
+
+def deck_problems(decklist: dict, cards_path: Path) -> list:
+    """Every catalog-checkable problem with an srg decklist, as messages.
+
+    `decklist` is deck_data_to_decklist's output. An empty list means the deck
+    is plausible and worth handing to the engine. If the catalog file is not
+    there, nothing can be checked here and the engine gets the final say.
+    """
+    if not cards_path.exists():
+        return []
+    index = _catalog(cards_path)
+    problems = [
+        _role_problem(
+            index,
+            decklist["competitor"]["db_uuid"],
+            "competitor",
+            "SingleCompetitorCard",
+        ),
+        _role_problem(
+            index, decklist["entrance"]["db_uuid"], "entrance", "EntranceCard"
+        ),
+    ]
+    problems = [p for p in problems if p]
+    problems += _main_deck_problems(index, [c["db_uuid"] for c in decklist["cards"]])
+    return problems
@@ -0,0 +1,150 @@
+"""
+@copyright Copyright 2025, Brandon Arrendondo
+See LICENSE.txt for details.
+
+One-parse deploy pipeline: every output workflow.sh builds from cards.yaml,
+from a single parse of it.
+
+cards.yaml is parsed (card_catalog.read_cards) and given uuids once, and each
+stage gets its own copy of the result. Stages that don't depend on each other
+run concurrently:
+
+  postgres        load_cards_from_yaml --sync, falling back to a
+                  catalog_swap rebuild when the sync fails for any reason;
+                  writes the augmented YAML, then checks the live card count
+                  (which the sitemap is built from) against the parse
+  mobile db       create_mobile_db into srg_cards_mobile.db, then
+  db manifest     generate_db_manifest (row counts come from the mobile stage),
+                  recording a catalog version and its deltas (mobile_versions)
+  image manifest  generate_image_manifest and the image packs (no catalog needed)
+
+A per-stage timing summary is printed at the end. The main database is what
+the site serves and the mobile database and its manifest are what the app
+downloads, so a failure in either fails the run (exit 1); the image manifest
+only warns, as it did in workflow.sh.
+
+Usage (from backend/app):
+    python deploy_pipeline.py [cards.yaml] [augmented_cards.yaml]
+"""
+
+import argparse
+import copy
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+import catalog_swap
+import generate_db_manifest
+import generate_image_manifest
+from card_catalog import read_cards
+from create_mobile_db import create_mobile_db
+from database import SessionLocal
+from load_cards_from_yaml import MODEL_MAP, ensure_uuids, sync_cards
+from models.base import Card
+
+MOBILE_DB = "srg_cards_mobile.db"
+
+# Stages whose failure fails the whole run (the postgres stage includes its
+# card count check, the mobile stage its manifest).
+_REQUIRED = ("postgres", "mobile db")
+
+
+def _timed(name: str, timings: dict, fn, *args):
+    start = time.perf_counter()
+    try:
+        return fn(*args)
+    finally:
+        timings[name] = time.perf_counter() - start
+
+
+def _postgres(input_path: str, output_path: str, data: list):
+    try:
+        sync_cards(input_path, output_path, data=copy.deepcopy(data))
+    except (Exception, SystemExit) as err:
+        # Schema drift (sync_cards exits), or a SQL or integrity error partway:
+        # the sync's transaction was rolled back, so rebuild from scratch.
+        print(f"[WARNING] Incremental sync failed ({err!r}); rebuilding the catalog")
+        fresh = copy.deepcopy(data)
+        if catalog_swap.rebuild(input_path, output_path, data=fresh) != 0:
+            raise RuntimeError("catalog rebuild failed validation") from None
+    _check_card_count(data)
+
+
+def _check_card_count(data: list):
+    """Fail unless the live catalog holds every card the parse has."""
+    expected = len({c["db_uuid"] for c in data if c.get("card_type") in MODEL_MAP})
+    db = SessionLocal()
+    try:
+        count = db.query(Card).count()
+    finally:
+        db.close()
+    if count != expected:
+        raise RuntimeError(f"main database has {count} cards, expected {expected}")
+    # The sitemap is generated from these rows: one URL per card + homepage.
+    print(f"[SITEMAP] main database has {count} cards, {count + 1} URLs")
+
+
+def _mobile(input_path: str, data: list, timings: dict):
+    stats = _timed("mobile db", timings, create_mobile_db, MOBILE_DB, input_path, data)
+    if stats is None:
+        raise RuntimeError("no cards were loaded into the mobile database")
+    _timed(
+        "db manifest",
+        timings,
+        generate_db_manifest.generate_manifest,
+        MOBILE_DB,
+        stats,
+        True,
+    )
+
+
+def run(input_path: str, output_path: str) -> int:
+    timings: dict = {}
+    start = time.perf_counter()
+    data = _timed("parse yaml", timings, read_cards, input_path)
+    # Once, up front, so the database and the mobile db agree on new cards' ids.
+    ensure_uuids(data)
+
+    stages = {
+        "postgres": lambda: _timed(
+            "postgres", timings, _postgres, input_path, output_path, data
+        ),
+        "mobile db": lambda: _mobile(input_path, copy.deepcopy(data), timings),
+        "image manifest": lambda: _timed(
+            "image manifest", timings, generate_image_manifest.generate_manifest
+        ),
+    }
+    failed = []
+    with ThreadPoolExecutor(max_workers=len(stages)) as pool:
+        futures = {name: pool.submit(stage) for name, stage in stages.items()}
+        for name, future in futures.items():
+            try:
+                future.result()
+            except (Exception, SystemExit):
+                failed.append(name)
+                print(f"[ERROR] Stage {name!r} failed:")
+                traceback.print_exc()
+
+    print("[TIMING]")
+    for name, seconds in timings.items():
+        print(f"  {name:<32} {seconds:8.3f}s")
+    print(f"  {'total (wall)':<32} {time.perf_counter() - start:8.3f}s")
+
+    for name in failed:
+        level = "ERROR" if name in _REQUIRED else "WARNING"
+        print(f"[{level}] {name} did not complete")
+    return 1 if any(name in _REQUIRED for name in failed) else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Build every deploy output from one parse of cards.yaml."
+    )
+    parser.add_argument("input", nargs="?", default="cards.yaml")
+    parser.add_argument("output", nargs="?", default="augmented_cards.yaml")
+    args = parser.parse_args(argv)
+    return run(args.input, args.output)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -15,6 +15,8 @@ import sqlite3
 from pathlib import Path
 from datetime import datetime
 
+import mobile_versions
+
 DB_PATH = Path(__file__).parent / "srg_cards_mobile.db"
 OUTPUT_FILE = Path(__file__).parent / "db_manifest.json"
 
@@ -57,8 +59,15 @@ def get_db_stats(db_path):
     return stats
 
 
-def generate_manifest(db_path=None):
-    """Generate manifest with hash and stats."""
+def generate_manifest(db_path=None, stats=None, versioned=False):
+    """Generate manifest with hash and stats.
+
+    `stats` are the row counts if the caller already has them (deploy_pipeline.py
+    gets them from create_mobile_db); otherwise they are read from the database.
+    With `versioned`, the database is also recorded as a catalog version
+    (mobile_versions.py) and the manifest says which, so the app can ask for
+    /api/cards/changes instead of downloading the whole file.
+    """
     if db_path is None:
         db_path = DB_PATH
 
@@ -74,11 +83,16 @@ def generate_manifest(db_path=None):
     file_hash = sha256_file(db_path)
 
     # Get stats
-    stats = get_db_stats(db_path)
+    if stats is None:
+        stats = get_db_stats(db_path)
 
     # File size
     file_size = db_path.stat().st_size
 
+    catalog_version = None
+    if versioned:
+        catalog_version = mobile_versions.record_card_version(db_path, file_hash)
+
     # Create manifest
     manifest = {
         "version": 1,
@@ -90,6 +104,8 @@ def generate_manifest(db_path=None):
         "related_finishes_count": stats["related_finishes_count"],
         "related_cards_count": stats["related_cards_count"],
     }
+    if catalog_version is not None:
+        manifest["catalog_version"] = catalog_version
 
     # Write JSON
     with open(OUTPUT_FILE, "w") as f:
@@ -101,6 +117,8 @@ def generate_manifest(db_path=None):
     print(f"  Related cards: {stats['related_cards_count']}")
     print(f"  Size: {file_size:,} bytes")
     print(f"  Hash: {file_hash[:16]}...")
+    if catalog_version is not None:
+        print(f"  Catalog version: {catalog_version}")
     print(f"Output: {OUTPUT_FILE}")
 
 
@@ -6,65 +6,149 @@ Usage:
     python3 generate_image_manifest.py
 
 Output:
-    images_manifest.yaml in the same directory
+    images_manifest.json in the same directory, and images_manifest_short.json:
+    the same images with 16-hex hashes, and paths only where they differ from
+    the usual "<uuid[:2]>/<uuid>.webp". Each run that changes the images
+    records a new `manifest_version` with deltas from earlier ones
+    (mobile_versions.py), served by /api/images/manifest/changes. The images
+    are also bundled into per-shard packs for first-run sync (image_packs.py).
 """
 
 import os
 import hashlib
 import json
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 
+import image_packs
+import mobile_versions
+
 IMAGES_DIR = Path(__file__).parent / "images" / "mobile"
 OUTPUT_FILE = Path(__file__).parent / "images_manifest.json"
+SHORT_OUTPUT_FILE = Path(__file__).parent / "images_manifest_short.json"
+# rel path -> [size, mtime_ns, inode, sha256] from the previous run; a file
+# whose stat still matches is not read again.
+CACHE_FILE = Path(__file__).parent / ".images_hash_cache.json"
+
+# hashlib releases the GIL while it digests, so threads hash in parallel.
+HASH_WORKERS = os.cpu_count() or 4
+_READ_SIZE = 1 << 20
 
 
 def sha256_file(filepath):
     """Calculate SHA-256 hash of a file."""
     sha256 = hashlib.sha256()
     with open(filepath, "rb") as f:
-        for chunk in iter(lambda: f.read(8192), b""):
+        for chunk in iter(lambda: f.read(_READ_SIZE), b""):
             sha256.update(chunk)
     return sha256.hexdigest()
 
 
-def generate_manifest():
-    """Scan mobile images and generate manifest with hashes."""
-    images = {}
+def _scan(directory):
+    """Yield (path, stat) for every .webp under `directory`."""
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _scan(entry.path)
+            elif entry.name.endswith(".webp"):
+                yield Path(entry.path), entry.stat()
 
-    print(f"Scanning images in {IMAGES_DIR}...")
 
-    # Walk through all subdirectories (organized by first 2 chars of UUID)
-    for root, dirs, files in os.walk(IMAGES_DIR):
-        for filename in files:
-            if filename.endswith(".webp"):
-                filepath = Path(root) / filename
-                uuid = filename.replace(".webp", "")
+def _load_cache():
+    try:
+        with open(CACHE_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
 
-                # Calculate hash
-                file_hash = sha256_file(filepath)
 
-                # Get relative path from mobile dir (e.g., "ab/abc123.webp")
-                rel_path = filepath.relative_to(IMAGES_DIR)
+def _write_atomic(path, value, **dump_args):
+    """Write `value` as JSON to `path` via a temp file and rename, so readers
+    (the API serves the manifest) never see a half-written file."""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(value, f, **dump_args)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
 
-                images[uuid] = {"path": str(rel_path), "hash": file_hash}
+
+def generate_manifest():
+    """Scan mobile images and generate manifest with hashes.
+
+    Only files that are new or whose size, mtime or inode changed since the
+    last run are hashed (in parallel); the rest reuse the cached hash.
+    """
+    print(f"Scanning images in {IMAGES_DIR}...")
+
+    cache = _load_cache()
+    fresh_cache = {}
+    to_hash = []
+    # Images are organized in subdirectories by the first 2 chars of the UUID.
+    found = _scan(IMAGES_DIR) if IMAGES_DIR.is_dir() else []
+    for filepath, st in found:
+        # Relative path from mobile dir (e.g., "ab/abc123.webp")
+        rel_path = str(filepath.relative_to(IMAGES_DIR))
+        key = [st.st_size, st.st_mtime_ns, st.st_ino]
+        cached = cache.get(rel_path)
+        if cached and cached[:3] == key:
+            fresh_cache[rel_path] = cached
+        else:
+            to_hash.append((rel_path, filepath, key))
+
+    with ThreadPoolExecutor(max_workers=HASH_WORKERS) as pool:
+        hashes = pool.map(sha256_file, [filepath for _, filepath, _ in to_hash])
+        for (rel_path, _, key), file_hash in zip(to_hash, hashes):
+            fresh_cache[rel_path] = key + [file_hash]
+
+    images = {}
+    for rel_path, entry in fresh_cache.items():
+        uuid = Path(rel_path).name.replace(".webp", "")
+        images[uuid] = {"path": rel_path, "hash": entry[3]}
 
     # Sort images by UUID for consistent diffs
     sorted_images = dict(sorted(images.items()))
 
+    manifest_version = mobile_versions.record_image_version(sorted_images)
+    generated = datetime.now().isoformat()
+
     # Create manifest
     manifest = {
         "version": 1,
-        "generated": datetime.now().isoformat(),
+        "manifest_version": manifest_version,
+        "generated": generated,
         "image_count": len(sorted_images),
         "images": sorted_images,
     }
+    short = {
+        "version": 1,
+        "manifest_version": manifest_version,
+        "generated": generated,
+        "image_count": len(sorted_images),
+        "images": {uuid: image["hash"][:16] for uuid, image in sorted_images.items()},
+        "paths": {
+            uuid: image["path"]
+            for uuid, image in sorted_images.items()
+            if image["path"] != f"{uuid[:2]}/{uuid}.webp"
+        },
+    }
 
     # Write JSON with sorted keys
-    with open(OUTPUT_FILE, "w") as f:
-        json.dump(manifest, f, indent=2, sort_keys=False)
-
-    print(f"Generated manifest with {len(images)} images")
+    _write_atomic(OUTPUT_FILE, manifest, indent=2, sort_keys=False)
+    _write_atomic(SHORT_OUTPUT_FILE, short, separators=(",", ":"))
+    _write_atomic(CACHE_FILE, fresh_cache, separators=(",", ":"))
+    if fresh_cache:
+        image_packs.build_packs(IMAGES_DIR, fresh_cache, manifest_version)
+
+    print(
+        f"Generated manifest with {len(images)} images "
+        f"({len(to_hash)} hashed, {len(images) - len(to_hash)} unchanged)"
+    )
+    print(f"Manifest version: {manifest_version}")
     print(f"Output: {OUTPUT_FILE}")
 
 
@@ -0,0 +1,110 @@
+"""
+@copyright Copyright 2025, Brandon Arrendondo
+See LICENSE.txt for details.
+
+Image packs: the mobile images bundled per shard, for a fresh install's sync.
+
+Fetching ~6.5k images one request each is slow on a phone. Images already
+live in two-character shard directories (images/mobile/ab/ab12....webp); each
+shard becomes one pack: its .webp files concatenated in uuid order, nothing
+else (WebP is already compressed). images_packs.json indexes them:
+
+  {"version": 1, "manifest_version": N,
+   "packs": {"ab": {"file": "ab-<id>.pack", "size": bytes,
+                    "images": {uuid: [offset, length, hash16], ...}}, ...}}
+
+so the app downloads /images/packs/<file> (a plain static file: Range
+requests let an interrupted download resume), slices each image out by
+offset/length and checks it against the manifest's hash.
+
+Packs are content-addressed: <id> is derived from the shard's uuids and
+image hashes, so a pack whose images didn't change keeps its name and is
+neither rewritten nor re-downloaded, and can be cached forever. Packs no
+longer referenced by the index are deleted.
+
+Built by generate_image_manifest.py from the hashes it already has.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+PACKS_DIR = Path(__file__).parent / "images" / "packs"
+INDEX_FILE = Path(__file__).parent / "images_packs.json"
+
+_COPY_SIZE = 1 << 20
+
+
+def _pack_id(members) -> str:
+    digest = hashlib.sha256()
+    for uuid, _, _, file_hash in members:
+        digest.update(f"{uuid}:{file_hash}\n".encode("ascii"))
+    return digest.hexdigest()[:16]
+
+
+def _write_pack(path: Path, members) -> None:
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            for _, source, _, _ in members:
+                with open(source, "rb") as f:
+                    while chunk := f.read(_COPY_SIZE):
+                        out.write(chunk)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def build_packs(images_dir: Path, images: dict, manifest_version) -> dict:
+    """Write a pack per shard of `images` and the pack index; returns the index.
+
+    `images` maps rel path ("ab/<uuid>.webp") to [size, mtime_ns, inode,
+    sha256], as generate_image_manifest's hash cache holds them.
+    """
+    shards: dict = {}
+    for rel_path in sorted(images):
+        size, _, _, file_hash = images[rel_path]
+        shard, _, name = rel_path.rpartition("/")
+        uuid = name.removesuffix(".webp")
+        shards.setdefault(shard, []).append(
+            (uuid, images_dir / rel_path, size, file_hash)
+        )
+
+    PACKS_DIR.mkdir(parents=True, exist_ok=True)
+    packs = {}
+    written = 0
+    for shard, members in sorted(shards.items()):
+        members.sort()
+        file_name = f"{shard or 'root'}-{_pack_id(members)}.pack"
+        path = PACKS_DIR / file_name
+        if not path.exists():
+            _write_pack(path, members)
+            written += 1
+        offset = 0
+        entries = {}
+        for uuid, _, size, file_hash in members:
+            entries[uuid] = [offset, size, file_hash[:16]]
+            offset += size
+        packs[shard] = {"file": file_name, "size": offset, "images": entries}
+
+    index = {"version": 1, "manifest_version": manifest_version, "packs": packs}
+    fd, tmp = tempfile.mkstemp(dir=INDEX_FILE.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(index, f, separators=(",", ":"))
+        os.replace(tmp, INDEX_FILE)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+    # Only after the new index is in place: a phone mid-download of an old
+    # pack loses it, and restarts from the new index.
+    live = {pack["file"] for pack in packs.values()}
+    for path in PACKS_DIR.glob("*.pack"):
+        if path.name not in live:
+            path.unlink()
+    print(f"Image packs: {len(packs)} ({written} rewritten) in {PACKS_DIR}")
+    return index
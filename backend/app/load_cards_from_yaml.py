@@ -5,14 +5,27 @@ Refactored two-pass loader for SRG Supershow cards:
  - Ensure UUIDs, insert base cards, link finishes, and dump YAML
  - **Normalize tags to always be a list of strings**
  - **Order keys for readability and proper YAML formatting**
+ - **--bulk: build per-table row lists and executemany them in one
+   transaction, with a timing report per phase (see load_cards_bulk)**
+ - **--sync: diff against the live tables by per-card content hash and apply
+   only the inserts/updates/deletes, without dropping anything (see sync_cards)**
 """
 
-import sys
+import argparse
+import hashlib
+import json
+import time
 import yaml
 import uuid
+from contextlib import contextmanager
+from sqlalchemy import bindparam, select
+from sqlalchemy import inspect as sa_inspect
 from sqlalchemy.exc import IntegrityError
-from database import SessionLocal
+from card_catalog import read_cards
+from catalog_epoch import bump_catalog_epoch
+from database import SessionLocal, engine
 from models.base import (
+    Base,
     Card,
     CardType,
     MainDeckCard,
@@ -25,6 +38,8 @@ from models.base import (
     CrowdMeterCard,
     AttackSubtype,
     PlayOrderSubtype,
+    related_cards_table,
+    related_finishes_table,
 )
 
 # Map CardType.value -> model class
@@ -72,8 +87,7 @@ KEY_ORDER = [
 
 
 def read_yaml(path: str):
-    with open(path) as f:
-        return yaml.safe_load(f)
+    return read_cards(path)
 
 
 def ensure_uuids(data: list[dict]):
@@ -211,6 +225,12 @@ def link_related_cards(session, entries: list[dict], inserted: dict[str, object]
             print(f"[LINKED] Linked {related_count} related_cards for '{card.name}'")
 
 
+def card_hash(entry: dict) -> str:
+    """Content hash of a normalized entry; stored in cards.content_hash."""
+    canonical = json.dumps(entry, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
 def _build_kwargs(entry: dict) -> dict:
     # Common fields
     kw = {
@@ -229,6 +249,7 @@ def _build_kwargs(entry: dict) -> dict:
         # requirements: list of dicts (e.g. [{"min_strike": 8}]); JSONB in Postgres
         "requirements": entry.get("requirements") or None,
         "card_type": entry.get("card_type"),
+        "content_hash": card_hash(entry),
     }
 
     cls = MODEL_MAP.get(entry.get("card_type"))
@@ -325,13 +346,333 @@ def load_cards(input_path: str, output_path: str):
     link_related_cards(session, with_refs, inserted)
     session.commit()
     session.close()
+    bump_catalog_epoch()
     print("[COMPLETE] DB load complete.")
 
     write_yaml(data, output_path)
 
 
+# --- Bulk loader ---
+#
+# Same input, same validation and warnings as load_cards, but instead of one
+# ORM object + flush per card it builds a row list per table (cards, each
+# subclass table, then the two junction tables) and hands each list to a single
+# executemany. Everything happens in one transaction, so a failed load leaves
+# the (freshly recreated) tables empty rather than half-filled.
+
+
+@contextmanager
+def _phase(name: str, timings: list):
+    start = time.perf_counter()
+    yield
+    timings.append((name, time.perf_counter() - start))
+
+
+def build_card_rows(data: list[dict]):
+    """Split entries into per-table row lists for a joined-inheritance insert.
+
+    Returns (rows, loaded): rows maps Table -> list of row dicts; loaded maps
+    db_uuid -> card_type for every card that will be inserted.
+    """
+    rows: dict = {}
+    loaded: dict[str, str] = {}
+    for entry in data:
+        ctype = entry.get("card_type")
+        cls = MODEL_MAP.get(ctype)
+        if not cls:
+            print(f"[WARNING] Unknown card_type {ctype!r} for {entry.get('name')!r}")
+            continue
+        if entry["db_uuid"] in loaded:
+            print(
+                f"[ERROR] Insert failed {entry.get('name')!r}: "
+                f"duplicate db_uuid {entry['db_uuid']}"
+            )
+            continue
+        kwargs = _build_kwargs(entry)
+        # cards, then e.g. competitor_cards, then single_competitor_cards.
+        for table in sa_inspect(cls).tables:
+            rows.setdefault(table, []).append(
+                {c.name: kwargs.get(c.name) for c in table.columns}
+            )
+        loaded[entry["db_uuid"]] = ctype
+    return rows, loaded
+
+
+def build_finish_rows(data: list[dict], loaded: dict[str, str]) -> list[dict]:
+    competitor_types = {
+        t for t, cls in MODEL_MAP.items() if issubclass(cls, CompetitorCard)
+    }
+    pairs = []
+    seen = set()
+    for entry in data:
+        fids = entry.get("related_finishes") or []
+        if not fids or entry["db_uuid"] not in loaded:
+            continue
+        if loaded[entry["db_uuid"]] not in competitor_types:
+            print(f"[WARNING] '{entry['name']}' is not a competitor; finishes skipped")
+            continue
+        for fid in fids:
+            if loaded.get(fid) != CardType.main_deck.value:
+                print(f"[WARNING] Finish {fid} not found for '{entry['name']}'")
+                continue
+            if (entry["db_uuid"], fid) not in seen:
+                seen.add((entry["db_uuid"], fid))
+                pairs.append({"competitor_id": entry["db_uuid"], "finish_card_id": fid})
+    return pairs
+
+
+def build_related_rows(data: list[dict], loaded: dict[str, str]) -> list[dict]:
+    pairs = []
+    seen = set()
+    for entry in data:
+        rids = entry.get("related_cards") or []
+        if not rids or entry["db_uuid"] not in loaded:
+            continue
+        for rid in rids:
+            if rid not in loaded:
+                print(f"[WARNING] Related card {rid} not found for '{entry['name']}'")
+                continue
+            if (entry["db_uuid"], rid) not in seen:
+                seen.add((entry["db_uuid"], rid))
+                pairs.append({"card_id": entry["db_uuid"], "related_card_id": rid})
+    return pairs
+
+
+def _parsed(input_path: str, data, timings: list) -> list[dict]:
+    if data is not None:
+        return data
+    with _phase("parse yaml", timings):
+        return read_yaml(input_path)
+
+
+def load_cards_bulk(
+    input_path: str, output_path: str, schema: str | None = None, data=None
+):
+    """Bulk-load into empty card tables; `schema` targets a shadow copy of them
+    (catalog_swap.py) instead of the live ones. `data` is an already-parsed
+    cards.yaml (deploy_pipeline.py), used instead of reading `input_path`."""
+    timings: list = []
+    data = _parsed(input_path, data, timings)
+    with _phase("normalize", timings):
+        ensure_uuids(data)
+        normalize_entries(data)
+    with _phase("build rows", timings):
+        rows, loaded = build_card_rows(data)
+        finish_rows = build_finish_rows(data, loaded)
+        related_rows = build_related_rows(data, loaded)
+
+    if schema:
+        bind = engine.execution_options(schema_translate_map={None: schema})
+        session = SessionLocal(bind=bind)
+    else:
+        session = SessionLocal()
+    try:
+        # sorted_tables is FK order: cards before its subclass tables, and both
+        # before the junctions that reference them.
+        for table in Base.metadata.sorted_tables:
+            if table in rows:
+                with _phase(f"insert {table.name}", timings):
+                    session.execute(table.insert(), rows[table])
+        with _phase("insert related_finishes", timings):
+            if finish_rows:
+                session.execute(related_finishes_table.insert(), finish_rows)
+        with _phase("insert related_cards", timings):
+            if related_rows:
+                session.execute(related_cards_table.insert(), related_rows)
+        with _phase("commit", timings):
+            session.commit()
+    finally:
+        session.close()
+    if not schema:
+        bump_catalog_epoch()
+    print(
+        f"[COMPLETE] DB load complete: {len(loaded)} cards, "
+        f"{len(finish_rows)} finish links, {len(related_rows)} related links."
+    )
+
+    with _phase("write yaml", timings):
+        write_yaml(data, output_path)
+    _print_timings(timings)
+
+
+def _print_timings(timings: list):
+    print("[TIMING]")
+    for name, seconds in timings:
+        print(f"  {name:<32} {seconds:8.3f}s")
+    print(f"  {'total':<32} {sum(s for _, s in timings):8.3f}s")
+
+
+# --- Incremental sync ---
+#
+# A deploy usually changes a handful of cards. Rather than drop every card table
+# and reload 6.5k cards (serving an empty catalog meanwhile, and forcing the
+# shared-list backup/restore dance), --sync compares each card's content_hash
+# with the live row and touches only what differs. The whole diff is applied
+# in one transaction, so readers see the old catalog until the commit and the
+# new one after it — never a partial one.
+
+
+def _card_tables():
+    """Every card table, cards first (FK order)."""
+    card_tables = {t for cls in MODEL_MAP.values() for t in sa_inspect(cls).tables}
+    return [t for t in Base.metadata.sorted_tables if t in card_tables]
+
+
+def _sync_pairs(session, table, desired: list[dict], stale: set[str]):
+    """Make junction `table` hold exactly `desired`; returns (added, removed).
+
+    Pairs touching a `stale` card (deleted or about to be rewritten) are always
+    removed here, since its row is about to go; they come back with the insert
+    if they are still wanted.
+    """
+    a, b = [c.name for c in table.primary_key.columns]
+    want = {(r[a], r[b]) for r in desired}
+    have = set(session.execute(select(table.c[a], table.c[b])).tuples())
+    drop = {p for p in have if p not in want or p[0] in stale or p[1] in stale}
+    add = (want - have) | {p for p in want & drop}
+    if drop:
+        session.execute(
+            table.delete().where(
+                table.c[a] == bindparam("_a"), table.c[b] == bindparam("_b")
+            ),
+            [{"_a": x, "_b": y} for x, y in drop],
+        )
+    return add, len(drop)
+
+
+def _check_schema(session, tables):
+    """Exit unless the live tables have exactly the models' columns.
+
+    A sync only rewrites rows, so it can't add, drop or retype a column; and
+    when no card changed it would not even notice one went missing. Any such
+    drift (including a catalog from before cards.content_hash) needs a full
+    rebuild, which deploy_pipeline.py falls back to.
+    """
+    live = sa_inspect(session.connection())
+    drift = []
+    for table in tables:
+        have = {c["name"] for c in live.get_columns(table.name)}
+        want = {c.name for c in table.columns}
+        if have != want:
+            missing = ", ".join(sorted(want - have)) or "-"
+            extra = ", ".join(sorted(have - want)) or "-"
+            drift.append(f"{table.name} (missing: {missing}; extra: {extra})")
+    if drift:
+        raise SystemExit(
+            "card tables differ from the models: "
+            + "; ".join(drift)
+            + ". Run a full rebuild (create_db.py, then "
+            "load_cards_from_yaml.py --bulk)"
+        )
+
+
+def _diff_cards(session, card_rows: list[dict]):
+    """(gone, new, changed) db_uuids, comparing card_type and content_hash."""
+    cards = Card.__table__
+    live = {
+        uuid: (ctype, h)
+        for uuid, ctype, h in session.execute(
+            select(cards.c.db_uuid, cards.c.card_type, cards.c.content_hash)
+        ).tuples()
+    }
+    want = {r["db_uuid"]: (r["card_type"], r["content_hash"]) for r in card_rows}
+    gone = set(live) - set(want)
+    new = set(want) - set(live)
+    changed = {u for u in set(want) & set(live) if want[u] != live[u]}
+    return gone, new, changed
+
+
+def _rewrite_cards(session, tables, rows, stale: set[str], fresh: set[str]):
+    """Delete the `stale` cards' rows, then insert the `fresh` ones."""
+    if stale:
+        for table in reversed(tables):
+            session.execute(table.delete().where(table.c.db_uuid.in_(stale)))
+    for table in tables:
+        batch = [r for r in rows.get(table, []) if r["db_uuid"] in fresh]
+        if batch:
+            session.execute(table.insert(), batch)
+
+
+def _insert_pairs(session, table, pairs):
+    a, b = [c.name for c in table.primary_key.columns]
+    if pairs:
+        session.execute(table.insert(), [{a: x, b: y} for x, y in sorted(pairs)])
+
+
+def sync_cards(input_path: str, output_path: str, data=None):
+    timings: list = []
+    data = _parsed(input_path, data, timings)
+    with _phase("normalize", timings):
+        ensure_uuids(data)
+        normalize_entries(data)
+    with _phase("build rows", timings):
+        rows, loaded = build_card_rows(data)
+        finish_rows = build_finish_rows(data, loaded)
+        related_rows = build_related_rows(data, loaded)
+
+    tables = _card_tables()
+    session = SessionLocal()
+    try:
+        _check_schema(session, tables + [related_finishes_table, related_cards_table])
+        with _phase("diff", timings):
+            gone, new, changed = _diff_cards(session, rows[Card.__table__])
+            stale = gone | changed
+        with _phase("junction deletes", timings):
+            add_finishes, del_finishes = _sync_pairs(
+                session, related_finishes_table, finish_rows, stale
+            )
+            add_related, del_related = _sync_pairs(
+                session, related_cards_table, related_rows, stale
+            )
+        with _phase("card rewrites", timings):
+            _rewrite_cards(session, tables, rows, stale, new | changed)
+        with _phase("junction inserts", timings):
+            _insert_pairs(session, related_finishes_table, add_finishes)
+            _insert_pairs(session, related_cards_table, add_related)
+        with _phase("commit", timings):
+            session.commit()
+    finally:
+        session.close()
+    if stale or new or add_finishes or add_related or del_finishes or del_related:
+        bump_catalog_epoch()
+
+    print(
+        f"[COMPLETE] Sync complete: +{len(new)} new, ~{len(changed)} changed, "
+        f"-{len(gone)} removed, {len(loaded) - len(new) - len(changed)} unchanged; "
+        f"finish links +{len(add_finishes)}/-{del_finishes}, "
+        f"related links +{len(add_related)}/-{del_related}."
+    )
+    with _phase("write yaml", timings):
+        write_yaml(data, output_path)
+    _print_timings(timings)
+
+
 # CLI
 if __name__ == "__main__":
-    inp = sys.argv[1] if len(sys.argv) > 1 else "cards.yaml"
-    out = sys.argv[2] if len(sys.argv) > 2 else "augmented_cards.yaml"
-    load_cards(inp, out)
+    parser = argparse.ArgumentParser(description="Load cards.yaml into the DB.")
+    parser.add_argument("input", nargs="?", default="cards.yaml")
+    parser.add_argument("output", nargs="?", default="augmented_cards.yaml")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--bulk",
+        action="store_true",
+        help="Per-table executemany in one transaction, with a timing report",
+    )
+    parser.add_argument(
+        "--schema",
+        help="With --bulk: load into this (shadow) schema, see catalog_swap.py",
+    )
+    mode.add_argument(
+        "--sync",
+        action="store_true",
+        help="Apply only the changes against the live tables (no drop needed)",
+    )
+    args = parser.parse_args()
+    if args.schema and not args.bulk:
+        parser.error("--schema only applies to --bulk")
+    if args.sync:
+        sync_cards(args.input, args.output)
+    elif args.bulk:
+        load_cards_bulk(args.input, args.output, schema=args.schema)
+    else:
+        load_cards(args.input, args.output)
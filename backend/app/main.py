@@ -5,10 +5,11 @@ See LICENSE.txt for details.
 
 import os
 from pathlib import Path
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.staticfiles import StaticFiles
 from routers import cards
 from routers import images
+from routers import identify
 from routers import sitemap
 from routers import card_meta
 from routers import shared_lists
@@ -20,6 +21,7 @@ from routers import records_public
 from routers import decks_public
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse
+import mobile_versions
 
 __version__ = "%(prog)s 1.0.0 (Rel: 07 Aug 2025)"
 default_log_format = "%(filename)s:%(levelname)s:%(asctime)s] %(message)s"
@@ -59,16 +61,63 @@ app.mount(
     name="mobile",
 )
 
+# Built by generate_image_manifest.py (image_packs.py), so absent until the
+# first deploy has run it.
+app.mount(
+    "/images/packs",
+    StaticFiles(directory=str(IMAGES_ROOT / "packs"), check_dir=False),
+    name="packs",
+)
+
+
+def _changes_response(store, since: int, no_changes):
+    """The delta from version `since` to `store`'s current version.
+
+    410 means there is no delta from that version (too old, or unknown) and
+    the app should fall back to the full download.
+    """
+    current = store.current_version()
+    if current is not None and since == current:
+        return no_changes(current)
+    path = store.changes_path(since, current or 0)
+    if current is None or since > current or not path.exists():
+        raise HTTPException(
+            status_code=410, detail="No delta from that version; fetch everything"
+        )
+    return FileResponse(path, media_type="application/json")
+
 
 @app.get("/api/images/manifest", include_in_schema=False)
-def get_image_manifest():
-    """Return the image manifest for mobile app sync."""
-    manifest_path = BASE_DIR / "images_manifest.json"
+def get_image_manifest(short: bool = False):
+    """Return the image manifest for mobile app sync.
+
+    `short=true` returns the compact form (16-hex hashes, paths implied by the
+    uuid); see generate_image_manifest.py.
+    """
+    name = "images_manifest_short.json" if short else "images_manifest.json"
+    manifest_path = BASE_DIR / name
     if manifest_path.exists():
         return FileResponse(manifest_path, media_type="application/json")
     return {"error": "Manifest not found"}
 
 
+@app.get("/api/images/packs", include_in_schema=False)
+def get_image_packs():
+    """Return the image pack index (bundled images for first-run sync)."""
+    index_path = BASE_DIR / "images_packs.json"
+    if index_path.exists():
+        return FileResponse(index_path, media_type="application/json")
+    return {"error": "Pack index not found"}
+
+
+@app.get("/api/images/manifest/changes", include_in_schema=False)
+def get_image_manifest_changes(since: int = Query(..., ge=0)):
+    """Return the images added, changed or removed since manifest version `since`."""
+    return _changes_response(
+        mobile_versions.IMAGES, since, mobile_versions.no_image_changes
+    )
+
+
 @app.get("/api/cards/manifest", include_in_schema=False)
 def get_cards_manifest():
     """Return the card database manifest for mobile app sync."""
@@ -91,6 +140,14 @@ def get_cards_database():
     return {"error": "Database not found"}
 
 
+@app.get("/api/cards/changes", include_in_schema=False)
+def get_cards_changes(since: int = Query(..., ge=0)):
+    """Return the card rows that changed since catalog version `since`."""
+    return _changes_response(
+        mobile_versions.CARDS, since, mobile_versions.no_card_changes
+    )
+
+
 @app.get("/favicon.ico", include_in_schema=False)
 def favicon():
     return FileResponse(os.path.join("static", "favicon.ico"))
@@ -98,6 +155,7 @@ def favicon():
 
 app.include_router(cards.router)
 app.include_router(images.router)
+app.include_router(identify.router)
 app.include_router(sitemap.router)
 app.include_router(card_meta.router)
 app.include_router(submissions.router, prefix="/api", tags=["submissions"])
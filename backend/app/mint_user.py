@@ -20,7 +20,7 @@ import sys
 
 from database import SessionLocal
 from models.base import User
-from rib_security import generate_key, hash_key
+from rib_security import bump_auth_epoch, generate_key, hash_key
 
 
 def _print_key(email: str, raw_key: str, *, rotated: bool):
@@ -59,6 +59,7 @@ def main(argv=None):
                 return 1
             user.active = False
             db.commit()
+            bump_auth_epoch()  # running API workers drop their cached users
             print(f"Deactivated user: {email}")
             return 0
 
@@ -80,6 +81,8 @@ def main(argv=None):
             user.active = True
             rotated = True
         db.commit()
+        if rotated:
+            bump_auth_epoch()  # the old key must stop working now, not at TTL
 
         _print_key(email, raw_key, rotated=rotated)
         return 0
@@ -0,0 +1,229 @@
+"""
+@copyright Copyright 2025, Brandon Arrendondo
+See LICENSE.txt for details.
+
+Versioned snapshots of what phones sync, for delta downloads.
+
+Phones used to re-download the whole srg_cards_mobile.db whenever
+db_manifest.json's hash changed, even for a one-card errata, and fetch the
+whole image manifest on every sync check. Instead, every deploy that changes
+one of them gets its next version, recorded in a VersionStore directory:
+
+  state-<v>.json          what version <v> contained, in compact form
+  changes-<old>-<v>.json  the delta from each still-kept older version to <v>
+
+so /api/cards/changes and /api/images/manifest/changes only have to serve a
+file. The app applies the delta and records the manifest's version. A version
+older than the last KEEP_VERSIONS (or from before this existed) has no delta,
+and the app falls back to the full download.
+
+Card database (CARDS, version in db_manifest.json's `catalog_version`): the
+state is uuid -> row hash plus both link tables, read back from the built
+SQLite file, so a delta is exactly the rows phones would otherwise download:
+upserted card rows (full rows, in `columns` order), deleted uuids, and
+added/removed link pairs. The build is reproducible (create_mobile_db.py), so
+a deploy that changes nothing keeps the same version.
+
+Images (IMAGES, version in images_manifest.json's `manifest_version`): the
+state is the manifest's uuid -> {path, hash}; a delta lists changed (new or
+re-encoded) and removed images.
+
+Config via env:
+  SRG_MOBILE_VERSIONS_DIR  where card database states and deltas live
+                           (default: app/mobile_versions)
+  SRG_IMAGE_VERSIONS_DIR   same for the image manifest
+                           (default: app/image_versions)
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+from pathlib import Path
+
+_APP_DIR = Path(__file__).resolve().parent
+
+# Deltas are kept from this many previous versions; phones further behind
+# download everything.
+KEEP_VERSIONS = 30
+
+_LINK_TABLES = ("card_related_finishes", "card_related_cards")
+
+
+def _write_json(path: Path, value) -> None:
+    # Write-then-rename: the API may be serving these while a deploy runs.
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(value, f, separators=(",", ":"))
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def _read_json(path: Path):
+    with open(path) as f:
+        return json.load(f)
+
+
+class VersionStore:
+    """A directory of numbered state snapshots and the deltas to the latest."""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+
+    def versions(self) -> list[int]:
+        """Recorded versions, oldest first."""
+        if not self.directory.is_dir():
+            return []
+        return sorted(
+            int(p.name[len("state-") : -len(".json")])
+            for p in self.directory.glob("state-*.json")
+        )
+
+    def current_version(self):
+        """The latest recorded version, or None if there is none yet."""
+        versions = self.versions()
+        return versions[-1] if versions else None
+
+    def changes_path(self, since: int, version: int) -> Path:
+        return self.directory / f"changes-{since}-{version}.json"
+
+    def _state_path(self, version: int) -> Path:
+        return self.directory / f"state-{version}.json"
+
+    def record(self, fingerprint: str, build_state, diff) -> int:
+        """Record a new version unless `fingerprint` matches the latest one.
+
+        `build_state()` returns the new state (a JSON-able dict, only called if
+        something changed) and `diff(old_state, new_state)` the delta between
+        two states. Returns the current version either way.
+        """
+        versions = self.versions()
+        if versions:
+            latest = _read_json(self._state_path(versions[-1]))
+            if latest["fingerprint"] == fingerprint:
+                return latest["version"]
+        version = versions[-1] + 1 if versions else 1
+        state = {"version": version, "fingerprint": fingerprint, **build_state()}
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        kept = versions[-(KEEP_VERSIONS - 1) :] if KEEP_VERSIONS > 1 else []
+        for old_version in kept:
+            old = _read_json(self._state_path(old_version))
+            delta = {"from": old_version, "to": version, **diff(old, state)}
+            _write_json(self.changes_path(old_version, version), delta)
+        # The state goes last: once it exists, its deltas do too.
+        _write_json(self._state_path(version), state)
+
+        for old_version in versions:
+            if old_version not in kept:
+                self._state_path(old_version).unlink(missing_ok=True)
+        for path in self.directory.glob("changes-*.json"):
+            if not path.name.endswith(f"-{version}.json"):
+                path.unlink()
+        return version
+
+
+CARDS = VersionStore(
+    Path(os.environ.get("SRG_MOBILE_VERSIONS_DIR", str(_APP_DIR / "mobile_versions")))
+)
+IMAGES = VersionStore(
+    Path(os.environ.get("SRG_IMAGE_VERSIONS_DIR", str(_APP_DIR / "image_versions")))
+)
+
+
+# --- Card database ---
+
+
+def _row_hash(row) -> str:
+    return hashlib.sha256(
+        json.dumps(row, separators=(",", ":")).encode("utf-8")
+    ).hexdigest()[:16]
+
+
+def no_card_changes(version: int) -> dict:
+    """The card database delta from `version` to itself."""
+    delta = {"from": version, "to": version, "upserted": [], "deleted": []}
+    for table in _LINK_TABLES:
+        delta[table] = {"added": [], "removed": []}
+    return delta
+
+
+def _read_db(db_path):
+    """(columns, {uuid: row}, {link table: set of pairs}) of a mobile database."""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        cursor = conn.execute("SELECT * FROM cards ORDER BY db_uuid")
+        columns = [d[0] for d in cursor.description]
+        rows = {row[0]: list(row) for row in cursor}
+        links = {
+            table: {tuple(p) for p in conn.execute(f"SELECT * FROM {table}")}
+            for table in _LINK_TABLES
+        }
+    finally:
+        conn.close()
+    return columns, rows, links
+
+
+def record_card_version(db_path, db_hash: str) -> int:
+    """Record the mobile database at `db_path` as a catalog version."""
+    columns = rows = None
+
+    def build_state():
+        nonlocal columns, rows
+        columns, rows, links = _read_db(db_path)
+        state = {"cards": {uuid: _row_hash(row) for uuid, row in rows.items()}}
+        for table in _LINK_TABLES:
+            state[table] = sorted(links[table])
+        return state
+
+    def diff(old, new):
+        delta = {
+            "columns": columns,
+            "upserted": [
+                rows[uuid]
+                for uuid, row_hash in new["cards"].items()
+                if old["cards"].get(uuid) != row_hash
+            ],
+            "deleted": sorted(set(old["cards"]) - set(new["cards"])),
+        }
+        for table in _LINK_TABLES:
+            before = {tuple(p) for p in old[table]}
+            after = {tuple(p) for p in new[table]}
+            delta[table] = {
+                "added": sorted(after - before),
+                "removed": sorted(before - after),
+            }
+        return delta
+
+    return CARDS.record(db_hash, build_state, diff)
+
+
+# --- Image manifest ---
+
+
+def no_image_changes(version: int) -> dict:
+    """The image manifest delta from `version` to itself."""
+    return {"from": version, "to": version, "changed": {}, "removed": []}
+
+
+def record_image_version(images: dict) -> int:
+    """Record an image manifest's `images` (uuid -> {path, hash}) as a version."""
+    fingerprint = hashlib.sha256(
+        json.dumps(images, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    ).hexdigest()
+
+    def diff(old, new):
+        return {
+            "changed": {
+                uuid: image
+                for uuid, image in new["images"].items()
+                if old["images"].get(uuid) != image
+            },
+            "removed": sorted(set(old["images"]) - set(new["images"])),
+        }
+
+    return IMAGES.record(fingerprint, lambda: {"images": images}, diff)
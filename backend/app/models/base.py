@@ -14,6 +14,9 @@ from sqlalchemy import (
     DateTime,
     Text,
     JSON,
+    LargeBinary,
+    Index,
+    text,
 )
 from sqlalchemy.orm import relationship, declarative_base
 from sqlalchemy.dialects.postgresql import ARRAY, TEXT, JSONB
@@ -88,6 +91,10 @@ class Card(Base):
     # Open-ended list so freeform (non-skill) requirements can be added later.
     requirements = Column(JSONB, nullable=True)
     card_type = Column(String)
+    # SHA-256 of the card's normalized cards.yaml entry (relationships
+    # included), so `load_cards_from_yaml.py --sync` can tell which cards
+    # changed without comparing every column.
+    content_hash = Column(String(64), nullable=True)
 
     # Configure polymorphic mapping
     __mapper_args__ = {
@@ -191,6 +198,24 @@ class CrowdMeterCard(Card):
     }
 
 
+# Every table derived from cards.yaml proper — the card hierarchy and its two
+# junctions, in FK order. catalog_swap.py moves exactly these between schemas,
+# so anything that references them must be in this list too.
+CATALOG_TABLES = [
+    Card.__table__,
+    MainDeckCard.__table__,
+    CompetitorCard.__table__,
+    SingleCompetitorCard.__table__,
+    TornadoCompetitorCard.__table__,
+    TrioCompetitorCard.__table__,
+    EntranceCard.__table__,
+    SpectacleCard.__table__,
+    CrowdMeterCard.__table__,
+    related_cards_table,
+    related_finishes_table,
+]
+
+
 class SharedListType(str, enum.Enum):
     collection = "COLLECTION"
     deck = "DECK"
@@ -317,12 +342,43 @@ class GameRecord(Base):
     snapshot = Column(Text, nullable=True)
     # Ordered observable frames (observer games) — playback source.
     frames = Column(JSON, nullable=True)
+    # How the replay payload is stored (see record_storage.py): NULL means the
+    # plain snapshot/frames columns above; 'zstd' means the compressed columns
+    # below hold it instead; 'zstd-chunked' keeps snapshot_z but puts the
+    # frames in frame_chunks. Always read through record_storage.
+    payload_format = Column(String(16), nullable=True)
+    snapshot_z = Column(LargeBinary, nullable=True)
+    frames_z = Column(LargeBinary, nullable=True)
+    # Number of frames (set for every format), so a window or a frameless
+    # response can be answered without touching the frames themselves.
+    frame_count = Column(Integer, nullable=True)
     # Provenance for imported archives: the record's `meta` block
     # ({created, source, match_type, notes}) — where a real-life game was played
     # and who transcribed it. Null for site games.
     meta = Column(JSON, nullable=True)
 
     owner = relationship("User", back_populates="records")
+    frame_chunks = relationship(
+        "GameRecordFrameChunk",
+        order_by="GameRecordFrameChunk.chunk_index",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+
+    # Public archive (routers/records_public.py): newest-first keyset paging
+    # walks the feed index; the expression / GIN indexes back its filters. The
+    # JSON columns are plain JSON, so the filters (and these indexes) go
+    # through ->> and ::jsonb. create_rib_tables.py adds any that are missing.
+    __table_args__ = (
+        Index("ix_rib_game_records_feed", "visibility", "created_at", "id"),
+        Index("ix_rib_game_records_winner", text("(result ->> 'winner')")),
+        Index("ix_rib_game_records_reason", text("(result ->> 'reason')")),
+        Index(
+            "ix_rib_game_records_participants",
+            text("(participants::jsonb) jsonb_path_ops"),
+            postgresql_using="gin",
+        ),
+    )
 
     def __repr__(self):
         return (
@@ -331,12 +387,38 @@ class GameRecord(Base):
         )
 
 
+class GameRecordFrameChunk(Base):
+    """A run of consecutive frames of one GameRecord, zstd-compressed.
+
+    Frame i of a record lives in chunk i // record_storage.FRAME_CHUNK, so a
+    replay window is served by decoding just the chunks it overlaps, however
+    long the game.
+    """
+
+    __tablename__ = "rib_game_record_frame_chunks"
+
+    record_id = Column(
+        String,
+        ForeignKey("rib_game_records.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    chunk_index = Column(Integer, primary_key=True)
+    # zstd-compressed JSON array of up to FRAME_CHUNK frames.
+    frames_z = Column(LargeBinary, nullable=False)
+
+    def __repr__(self):
+        return (
+            f"<GameRecordFrameChunk(record_id='{self.record_id}', "
+            f"chunk={self.chunk_index})>"
+        )
+
+
 # The Run It Back tables and everything else are in different categories, and
 # the deploy has to treat them differently.
 #
 # Every other table is DERIVED: the card tables are rebuilt from cards.yaml,
 # which is the source of truth, so `create_db.py` drops and recreates them on
-# each deploy. These three are ORIGINAL — hand-minted accounts, decks a user
+# each deploy. These are ORIGINAL — hand-minted accounts, decks a user
 # built, games they played or imported. Nothing regenerates them, so they must
 # survive a deploy. They carry no foreign key into the card tables (a deck
 # references cards by uuid string), so they can be left alone safely.
@@ -344,4 +426,4 @@ class GameRecord(Base):
 # `create_rib_tables.py` creates and extends them additively; `create_db.py`
 # excludes them from its drop. Anything added here must be listed here too, and
 # `create_db.py` asserts that every `rib_`-prefixed table is.
-RIB_MODELS = (User, Deck, GameRecord)
+RIB_MODELS = (User, Deck, GameRecord, GameRecordFrameChunk)
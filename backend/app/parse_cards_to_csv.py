@@ -9,7 +9,7 @@ parse_cards_to_csv.py
 import sys
 import argparse
 import logging
-import yaml
+from card_catalog import read_cards
 import csv
 
 __version__ = "%(prog)s 1.0.0"
@@ -17,8 +17,7 @@ default_log_format = "%(filename)s:%(levelname)s:%(asctime)s] %(message)s"
 
 
 def read_yaml(path: str):
-    with open(path) as f:
-        return yaml.safe_load(f)
+    return read_cards(path)
 
 
 def sort_key(card):
@@ -2,7 +2,7 @@
 import sys
 import argparse
 import logging
-import yaml
+from card_catalog import read_cards
 import os
 import glob
 
@@ -11,8 +11,7 @@ default_log_format = "%(filename)s:%(levelname)s:%(asctime)s] %(message)s"
 
 
 def read_yaml(path: str):
-    with open(path) as f:
-        return yaml.safe_load(f)
+    return read_cards(path)
 
 
 def main(argv):
@@ -0,0 +1,210 @@
+"""
+@copyright Copyright 2025, Brandon Arrendondo
+See LICENSE.txt for details.
+
+Compressed storage for GameRecord replay payloads.
+
+A record's `snapshot` (engine string) and `frames` (per-step public state) are
+by far the biggest things in rib_game_records — a long observer import runs to
+megabytes of repetitive JSON. They compress extremely well, so records are
+stored compressed, tagged by `payload_format`:
+
+  NULL            plain `snapshot` / `frames` columns (the original shape)
+  'zstd'          `snapshot_z`, and the whole frames array in `frames_z`
+  'zstd-chunked'  `snapshot_z`, and the frames split into FRAME_CHUNK-sized
+                  rib_game_record_frame_chunks rows — what new records get,
+                  since a replay window then decodes only the chunks it
+                  overlaps (frame_window)
+
+Every format also sets `frame_count` when it is written, so a response
+without frames never has to inflate them just to count them.
+
+All three are read the same way, so nothing has to be rewritten at once (see
+create_rib_tables.py --compress-records for the backfill).
+
+Routers never touch those columns directly: they write through store_payload
+and answer with record_response, which inflates the payload back into the
+GameRecordResponse shape the frontend has always received. List endpoints
+never need the payload at all, so they query with summary_only.
+
+Config via env:
+  RIB_RECORD_COMPRESSION  'off' to keep writing plain columns (default: zstd
+                          whenever the zstandard package is installed)
+"""
+
+import json
+import os
+
+from sqlalchemy.orm import defer, load_only
+
+from models.base import GameRecord, GameRecordFrameChunk
+from schemas.rib_schema import GameRecordResponse, GameRecordSummary
+
+try:
+    import zstandard
+except ImportError:  # optional: without it records are simply stored plain
+    zstandard = None
+
+FORMAT_ZSTD = "zstd"
+FORMAT_CHUNKED = "zstd-chunked"
+
+# Frames per chunk row: small enough that the first window of a replay decodes
+# almost nothing, large enough that chunks still compress well.
+FRAME_CHUNK = 64
+
+# Records are written once and read many times, so spend a little more CPU
+# than zstd's default (3) for a smaller row; decompression speed is unaffected.
+_LEVEL = 9
+
+
+def compression_enabled() -> bool:
+    off = os.environ.get("RIB_RECORD_COMPRESSION", "").lower() in ("off", "0", "no")
+    return zstandard is not None and not off
+
+
+def _compress(data: bytes) -> bytes:
+    # Compressor objects are not thread-safe and routes run in a thread pool,
+    # so each call gets its own (they are cheap to build).
+    return zstandard.ZstdCompressor(level=_LEVEL).compress(data)
+
+
+def _decompress(data: bytes) -> bytes:
+    return zstandard.ZstdDecompressor().decompress(data)
+
+
+def _pack_json(value) -> bytes:
+    return _compress(json.dumps(value, separators=(",", ":")).encode("utf-8"))
+
+
+def store_payload(record, snapshot, frames) -> None:
+    """Set `record`'s replay payload, compressed when compression is enabled."""
+    record.frames_z = None
+    if not compression_enabled():
+        record.payload_format = None
+        record.snapshot, record.snapshot_z = snapshot, None
+        record.frames, record.frame_count = frames, len(frames or [])
+        record.frame_chunks = []
+        return
+    record.payload_format = FORMAT_CHUNKED
+    record.snapshot = None
+    record.frames = None
+    record.snapshot_z = (
+        _compress(snapshot.encode("utf-8")) if snapshot is not None else None
+    )
+    frames = frames or []
+    record.frame_count = len(frames)
+    record.frame_chunks = [
+        GameRecordFrameChunk(
+            chunk_index=i // FRAME_CHUNK,
+            frames_z=_pack_json(frames[i : i + FRAME_CHUNK]),
+        )
+        for i in range(0, len(frames), FRAME_CHUNK)
+    ]
+
+
+def _unpack_chunks(chunks) -> list:
+    return [f for c in chunks for f in json.loads(_decompress(c.frames_z))]
+
+
+def load_snapshot(record):
+    """Return `record`'s snapshot string (or None), whatever its format."""
+    if record.payload_format is None:
+        return record.snapshot
+    if record.snapshot_z is None:
+        return None
+    return _decompress(record.snapshot_z).decode("utf-8")
+
+
+def load_frames(record):
+    """Return `record`'s whole frames list (or None), whatever its format."""
+    if record.payload_format is None:
+        return record.frames
+    if record.payload_format == FORMAT_ZSTD:
+        return json.loads(_decompress(record.frames_z)) if record.frames_z else None
+    if record.payload_format == FORMAT_CHUNKED:
+        return _unpack_chunks(record.frame_chunks) if record.frame_count else None
+    raise ValueError(f"unknown payload_format {record.payload_format!r}")
+
+
+def count_frames(record) -> int:
+    """Set and return `record.frame_count`, inflating its frames if needed."""
+    if record.frame_count is None:
+        record.frame_count = len(load_frames(record) or [])
+    return record.frame_count
+
+
+def load_payload(record):
+    """Return `record`'s (snapshot, frames), whichever format it was stored in."""
+    return load_snapshot(record), load_frames(record)
+
+
+def frame_window(db, record, start: int, count: int):
+    """Return (frames[start:start + count], total frame count) for `record`.
+
+    For chunked records only the overlapping chunk rows are fetched and
+    decoded, so the cost depends on `count`, not on the length of the game.
+    Older formats have to inflate the whole array to slice it.
+    """
+    if record.payload_format != FORMAT_CHUNKED:
+        frames = load_frames(record) or []
+        return frames[start : start + count], len(frames)
+    total = record.frame_count or 0
+    end = min(start + count, total)
+    if start >= end:
+        return [], total
+    first, last = start // FRAME_CHUNK, (end - 1) // FRAME_CHUNK
+    chunks = (
+        db.query(GameRecordFrameChunk)
+        .filter(
+            GameRecordFrameChunk.record_id == record.id,
+            GameRecordFrameChunk.chunk_index.between(first, last),
+        )
+        .order_by(GameRecordFrameChunk.chunk_index)
+        .all()
+    )
+    offset = start - first * FRAME_CHUNK
+    return _unpack_chunks(chunks)[offset : offset + end - start], total
+
+
+def record_response(record, include_frames=True) -> GameRecordResponse:
+    """The full GameRecordResponse for `record`, replay payload inflated.
+
+    With include_frames=False the frames are left out (fetch them in windows
+    instead); `frame_count` still says how many there are.
+    """
+    response = GameRecordResponse.model_validate(record)
+    response.snapshot = load_snapshot(record)
+    frames = load_frames(record) if include_frames else None
+    if record.frame_count is None:
+        # Written before frame_count was kept for every format, and not yet
+        # backfilled (create_rib_tables.py does that on every deploy).
+        if frames is None:
+            frames = load_frames(record)
+        response.frame_count = len(frames or [])
+    response.frames = frames if include_frames else None
+    return response
+
+
+def summary_only():
+    """Query option loading just the columns a GameRecordSummary is built from.
+
+    List endpoints serve summaries, and without this every row would drag its
+    snapshot/frames (plain or compressed) and decisions out of the database
+    only to be dropped by the response model.
+    """
+    return load_only(*(getattr(GameRecord, f) for f in GameRecordSummary.model_fields))
+
+
+def without_payload():
+    """Query options deferring every payload column, for frame-window lookups.
+
+    frame_window loads what it needs (chunks, or the older formats' frames)
+    itself, on first access; the snapshot is never needed for it.
+    """
+    return [
+        defer(GameRecord.snapshot),
+        defer(GameRecord.snapshot_z),
+        defer(GameRecord.frames),
+        defer(GameRecord.frames_z),
+        defer(GameRecord.decisions),
+    ]
@@ -16,6 +16,7 @@ Config via env:
              <srg_sim>/target build only for a dev checkout)
   SRG_SIM_DIR root of the srg_sim checkout (dev fallback only; default ~/data/srg_sim)
   SRG_CARDS  path to the cards.yaml export (default: this backend's app/cards.yaml)
+  SRG_BATCH_WORKERS  engine processes a batch validation runs at once (default 4)
 """
 
 import json
@@ -23,12 +24,19 @@ import os
 import shutil
 import subprocess
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from fastapi import HTTPException
 
+from deck_rules import deck_problems
+
 BASE_DIR = Path(__file__).resolve().parent
 
+# Each engine run is its own `srg` process, so threads are enough to run a
+# batch in parallel; this bounds how many processes one request can spawn.
+_BATCH_WORKERS = int(os.environ.get("SRG_BATCH_WORKERS", "4"))
+
 
 def _srg_sim_dir() -> Path:
     return Path(os.environ.get("SRG_SIM_DIR", str(Path.home() / "data" / "srg_sim")))
@@ -99,6 +107,19 @@ def deck_data_to_decklist(deck_data: dict) -> dict:
     }
 
 
+def _checked_decklist(deck_data: dict) -> dict:
+    """deck_data_to_decklist, then the in-process catalog checks (deck_rules).
+
+    Raises HTTPException(422) listing every catalog problem at once, so a deck
+    that cannot possibly load never costs an engine process.
+    """
+    decklist = deck_data_to_decklist(deck_data)
+    problems = deck_problems(decklist, _cards_path())
+    if problems:
+        raise HTTPException(status_code=422, detail="; ".join(problems))
+    return decklist
+
+
 def _run_session_open(
     deck_a_path: Path, deck_b_path: Path, seed: int, seat_b: str
 ) -> dict:
@@ -221,9 +242,55 @@ def enrich_deck(deck_data: dict) -> dict:
     Self-pairs the deck (open a match of the deck vs itself) and returns
     snapshot.deck_a — the enriched form WasmSession.open consumes.
     """
-    decklist = deck_data_to_decklist(deck_data)
+    return _enrich_decklist(_checked_decklist(deck_data))
+
+
+def _enrich_decklist(decklist: dict) -> dict:
     with tempfile.TemporaryDirectory() as td:
         p = Path(td) / "deck.yaml"
         p.write_text(json.dumps(decklist))  # JSON is valid YAML
         out = _run_session_open(p, p, seed=0, seat_b="heuristic")
     return out["snapshot"]["deck_a"]
+
+
+def _decklist_problem(decklist: dict):
+    """Engine-check one decklist; None if it loads, else the 422 detail."""
+    try:
+        _enrich_decklist(decklist)
+        return None
+    except HTTPException as e:
+        if e.status_code != 422:
+            raise
+        return str(e.detail)
+
+
+def validate_decks(deck_datas: list) -> list:
+    """Validate many deck_data payloads; returns a detail-or-None per deck.
+
+    Results come back in input order: None for a deck the engine can load,
+    otherwise the reason it can't (the same text a single /validate gives).
+    Structural and catalog problems are caught before the engine is involved,
+    and identical decklists — common when an organiser submits a field of
+    netdecks — are only run once. The distinct ones run in parallel, up to _BATCH_WORKERS
+    engine processes at a time. Engine availability problems (503/504) are
+    not per-deck findings, so they propagate and fail the whole batch.
+    """
+    results = [None] * len(deck_datas)
+    pending = {}  # canonical decklist JSON -> indices of the decks that share it
+    for i, deck_data in enumerate(deck_datas):
+        try:
+            decklist = _checked_decklist(deck_data)
+        except HTTPException as e:
+            results[i] = str(e.detail)
+            continue
+        pending.setdefault(json.dumps(decklist, sort_keys=True), []).append(i)
+
+    if pending:
+        keys = list(pending)
+        workers = max(1, min(_BATCH_WORKERS, len(keys)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            problems = pool.map(lambda k: _decklist_problem(json.loads(k)), keys)
+            for key, problem in zip(keys, problems):
+                for i in pending[key]:
+                    results[i] = problem
+    return results
@@ -8,15 +8,27 @@ Access keys are hand-minted, high-entropy (256-bit) URL-safe tokens. Because
 they are not user-chosen and not low-entropy, a plain SHA-256 (no bcrypt/salt)
 is sufficient to store them: brute-forcing a 256-bit random token from its hash
 is infeasible. The raw key is only ever shown once, at mint time.
+
+The auth epoch file is how admin tools reach the API's in-process user cache
+(auth.py): mint_user.py touches it whenever a key stops being valid, and every
+API worker drops its cached users when it sees the file's mtime move.
 """
 
 import hashlib
+import os
 import secrets
+from pathlib import Path
 
 KEY_PREFIX = "srg_"
 # 32 bytes -> 256 bits of entropy (token_urlsafe returns ~43 chars).
 _KEY_BYTES = 32
 
+AUTH_EPOCH_FILE = Path(
+    os.environ.get(
+        "RIB_AUTH_EPOCH_FILE", str(Path(__file__).resolve().parent / ".rib_auth_epoch")
+    )
+)
+
 
 def generate_key() -> str:
     """Return a fresh raw access key (show once, never stored)."""
@@ -26,3 +38,16 @@ def generate_key() -> str:
 def hash_key(raw_key: str) -> str:
     """SHA-256 hex digest of a raw access key. Stored in rib_users.key_hash."""
     return hashlib.sha256(raw_key.strip().encode("utf-8")).hexdigest()
+
+
+def auth_epoch() -> int:
+    """Current auth epoch (the epoch file's mtime_ns; 0 if it was never bumped)."""
+    try:
+        return AUTH_EPOCH_FILE.stat().st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+
+def bump_auth_epoch() -> None:
+    """Tell running API workers to forget their cached users."""
+    AUTH_EPOCH_FILE.touch()
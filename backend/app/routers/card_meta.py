@@ -1,6 +1,7 @@
 # backend/app/routers/card_meta.py
 from fastapi import APIRouter, Response
 from sqlalchemy.orm import Session
+from catalog_epoch import catalog_epoch
 from database import SessionLocal
 from models.base import Card
 import re
@@ -9,6 +10,10 @@ from typing import Optional
 
 router = APIRouter()
 
+# slug -> db_uuid for every named card, rebuilt once per catalog epoch instead of
+# scanning the whole cards table on every bot visit.
+_slugs = {"epoch": None, "index": {}}
+
 
 def slugify(name: str) -> str:
     return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
@@ -27,10 +32,17 @@ def card_by_id_or_slug(db: Session, key: str) -> Optional[Card]:
     if re.fullmatch(r"[0-9a-f]{32}", key, re.IGNORECASE):
         return db.query(Card).filter(Card.db_uuid == key).first()
     # Slug by name
-    for c in db.query(Card).all():
-        if c.name and slugify(c.name) == key:
-            return c
-    return None
+    epoch = catalog_epoch()
+    if _slugs["epoch"] != epoch:
+        index = {}
+        for name, db_uuid in db.query(Card.name, Card.db_uuid):
+            if name:
+                index.setdefault(slugify(name), db_uuid)
+        _slugs["epoch"], _slugs["index"] = epoch, index
+    db_uuid = _slugs["index"].get(key)
+    if db_uuid is None:
+        return None
+    return db.query(Card).filter(Card.db_uuid == db_uuid).first()
 
 
 @router.get("/card-meta/{id_or_slug}", response_class=Response)
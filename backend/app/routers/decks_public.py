@@ -9,14 +9,19 @@ decks and history, which live in the rib_* routers.
 Mounted under /api -> /api/decks/*.
 """
 
+from typing import List
+
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
-from rib_engine import enrich_deck, engine_info
+from rib_engine import enrich_deck, engine_info, validate_decks
 from schemas.shared_list_schema import DeckData
 
 router = APIRouter(prefix="/decks", tags=["decks-public"])
 
+# Every distinct deck in a batch costs an engine run, so cap the batch size.
+_BATCH_LIMIT = 64
+
 
 @router.get("/engine-info")
 def get_engine_info():
@@ -36,6 +41,14 @@ class ValidateResponse(BaseModel):
     detail: str | None = None
 
 
+class DeckBatchRequest(BaseModel):
+    decks: List[DeckData] = Field(..., max_length=_BATCH_LIMIT)
+
+
+class BatchValidateResponse(BaseModel):
+    results: List[ValidateResponse]
+
+
 @router.post("/enrich")
 def enrich(payload: DeckDataRequest):
     """Enrich a deck_data payload to engine-ready Deck JSON. 422 if invalid."""
@@ -55,3 +68,21 @@ def validate(payload: DeckDataRequest):
         return ValidateResponse(valid=True)
     except HTTPException as e:
         return ValidateResponse(valid=False, detail=str(e.detail))
+
+
+@router.post("/validate-batch", response_model=BatchValidateResponse)
+def validate_batch(payload: DeckBatchRequest):
+    """Validate up to _BATCH_LIMIT decks at once (tournament lists, builders).
+
+    `results[i]` answers `decks[i]`, with the detail /validate would give for
+    a deck that isn't legal. Unlike /validate, an engine that is unavailable
+    or times out (503/504) fails the whole request with that status rather
+    than marking decks invalid: it says nothing about the decks themselves.
+    Identical decklists are checked once and distinct ones run in parallel, so
+    a field of mostly-shared decks costs a handful of engine runs rather than
+    one each.
+    """
+    problems = validate_decks([d.model_dump() for d in payload.decks])
+    return BatchValidateResponse(
+        results=[ValidateResponse(valid=p is None, detail=p) for p in problems]
+    )
@@ -0,0 +1,50 @@
+"""
+@copyright Copyright 2025, Brandon Arrendondo
+See LICENSE.txt for details.
+
+Card identification router: which card is in this photo?
+
+The client's Content-Type is not trusted: the format is sniffed from the
+photo's first bytes, as for submissions, before anything decodes it.
+"""
+
+from fastapi import APIRouter, File, HTTPException, Query, UploadFile
+from starlette.concurrency import run_in_threadpool
+
+import card_identify
+from routers.submissions import sniff_image_type
+
+router = APIRouter()
+
+# Phone photos are a few MB; anything far past that is not a card photo.
+MAX_PHOTO_BYTES = 15 * 1024 * 1024
+
+
+@router.post("/cards/identify")
+async def identify_card(
+    image: UploadFile = File(...), limit: int = Query(5, ge=1, le=20)
+):
+    """
+    Identify a card from a photo or scan of it.
+    Returns the closest card images' db_uuids, best match first.
+    """
+    data = await image.read(MAX_PHOTO_BYTES + 1)
+    if len(data) > MAX_PHOTO_BYTES:
+        raise HTTPException(status_code=413, detail="Image is too large")
+    if sniff_image_type(data[:16]) is None:
+        raise HTTPException(
+            status_code=400, detail="Invalid file type. Allowed: JPEG, PNG, WebP"
+        )
+
+    # Decoding and matching are CPU work; keep them off the event loop.
+    try:
+        results = await run_in_threadpool(card_identify.identify, data, limit)
+    except card_identify.IdentifyUnavailable as e:
+        raise HTTPException(
+            status_code=503, detail=f"Card identification is unavailable: {e}"
+        )
+    except card_identify.PhotoTooLarge:
+        raise HTTPException(status_code=413, detail="Image has too many pixels")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Could not read the image")
+    return {"results": results}
@@ -10,35 +10,117 @@ only their observable frames. No owner identity is returned.
 Mounted under /api -> /api/games/public*.
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+import base64
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import cast, literal_column, or_, tuple_
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Session
 
 from auth import get_db
 from models.base import GameRecord
-from schemas.rib_schema import GameRecordListResponse, GameRecordResponse
+from record_storage import (
+    FRAME_CHUNK,
+    frame_window,
+    record_response,
+    summary_only,
+    without_payload,
+)
+from schemas.rib_schema import FrameWindow, GameRecordListResponse, GameRecordResponse
 
 router = APIRouter(prefix="/games/public", tags=["games-public"])
 
-# A sane cap so the public list can't be walked into a huge response.
+# A sane cap so one page can't be walked into a huge response.
 _LIST_LIMIT = 200
+_PAGE_SIZE = 50
+
+# Spelled exactly like the expression indexes on GameRecord (a literal key, not
+# a bound parameter) so the planner can match them.
+_WINNER = GameRecord.result.op("->>")(literal_column("'winner'"))
+_REASON = GameRecord.result.op("->>")(literal_column("'reason'"))
+
+
+def _encode_cursor(record: GameRecord) -> str:
+    raw = f"{record.created_at.isoformat()}|{record.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str):
+    try:
+        created_at, record_id = (
+            base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        )
+        return datetime.fromisoformat(created_at), record_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _apply_filters(q, competitor, winner, reason, source, information_view):
+    """Narrow the public feed; each filter is backed by a GameRecord index."""
+    if competitor:
+        # Either seat. Containment on the jsonb cast uses the participants GIN
+        # index; a competitor is matched by its exact name.
+        participants = cast(GameRecord.participants, JSONB)
+        q = q.filter(
+            or_(
+                participants.contains({"A": {"competitor": competitor}}),
+                participants.contains({"B": {"competitor": competitor}}),
+            )
+        )
+    if winner:
+        q = q.filter(_WINNER == winner)
+    if reason:
+        q = q.filter(_REASON == reason)
+    if source:
+        q = q.filter(GameRecord.source == source)
+    if information_view:
+        q = q.filter(GameRecord.information_view == information_view)
+    return q
 
 
 @router.get("", response_model=GameRecordListResponse)
-def list_public(db: Session = Depends(get_db)):
-    records = (
+def list_public(
+    cursor: Optional[str] = None,
+    limit: int = Query(_PAGE_SIZE, ge=1, le=_LIST_LIMIT),
+    competitor: Optional[str] = None,
+    winner: Optional[str] = Query(None, pattern="^(A|B|draw)$"),
+    reason: Optional[str] = None,
+    source: Optional[str] = Query(None, pattern="^(site|import)$"),
+    information_view: Optional[str] = Query(None, pattern="^(full|observer)$"),
+    db: Session = Depends(get_db),
+):
+    """One page of public games, newest first.
+
+    Keyset-paged on (created_at, id): pass the previous page's `next_cursor` as
+    `cursor` to continue. Unlike an offset, that costs the same at any depth
+    and never skips or repeats a game when new ones are published meanwhile.
+    `next_cursor` is null on the last page.
+    """
+    q = (
         db.query(GameRecord)
+        .options(summary_only())
         .filter(GameRecord.visibility == "public")
-        .order_by(GameRecord.created_at.desc())
-        .limit(_LIST_LIMIT)
+    )
+    q = _apply_filters(q, competitor, winner, reason, source, information_view)
+    if cursor:
+        q = q.filter(
+            tuple_(GameRecord.created_at, GameRecord.id) < _decode_cursor(cursor)
+        )
+    records = (
+        q.order_by(GameRecord.created_at.desc(), GameRecord.id.desc())
+        .limit(limit + 1)
         .all()
     )
-    return GameRecordListResponse(records=records)
+    next_cursor = _encode_cursor(records[limit - 1]) if len(records) > limit else None
+    return GameRecordListResponse(records=records[:limit], next_cursor=next_cursor)
 
 
-@router.get("/{record_id}", response_model=GameRecordResponse)
-def get_public(record_id: str, db: Session = Depends(get_db)):
+def _public_record(record_id: str, db: Session, *options) -> GameRecord:
     record = (
         db.query(GameRecord)
+        .options(*options)
         .filter(GameRecord.id == record_id, GameRecord.visibility == "public")
         .one_or_none()
     )
@@ -46,3 +128,22 @@ def get_public(record_id: str, db: Session = Depends(get_db)):
         # 404 whether it's private or absent — don't reveal private records exist.
         raise HTTPException(status_code=404, detail="Game not found")
     return record
+
+
+@router.get("/{record_id}", response_model=GameRecordResponse)
+def get_public(record_id: str, frames: bool = True, db: Session = Depends(get_db)):
+    """The whole record. `?frames=false` leaves the frames out (see /frames)."""
+    return record_response(_public_record(record_id, db), include_frames=frames)
+
+
+@router.get("/{record_id}/frames", response_model=FrameWindow)
+def get_public_frames(
+    record_id: str,
+    start: int = Query(0, ge=0, alias="from"),
+    count: int = Query(FRAME_CHUNK, ge=1, le=8 * FRAME_CHUNK),
+    db: Session = Depends(get_db),
+):
+    """A window of a public game's frames (same contract as the owner API)."""
+    record = _public_record(record_id, db, *without_payload())
+    frames, total = frame_window(db, record, start, count)
+    return FrameWindow(start=start, total=total, frames=frames)
@@ -13,13 +13,22 @@ Public browsing of records with visibility='public' (no login) is a separate,
 later surface (task 19); this router is the owner's private management API.
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from rib_engine import validate_record
 from sqlalchemy.orm import Session
 
 from auth import get_db, require_user
 from models.base import GameRecord, User
+from record_storage import (
+    FRAME_CHUNK,
+    frame_window,
+    record_response,
+    store_payload,
+    summary_only,
+    without_payload,
+)
 from schemas.rib_schema import (
+    FrameWindow,
     GameRecordCreate,
     GameRecordImport,
     GameRecordListResponse,
@@ -36,9 +45,10 @@ router = APIRouter(prefix="/rib/games", tags=["rib-records"])
 SUPPORTED_RECORD_SCHEMA = 1
 
 
-def _owned_record(record_id: str, user: User, db: Session) -> GameRecord:
+def _owned_record(record_id: str, user: User, db: Session, *options) -> GameRecord:
     record = (
         db.query(GameRecord)
+        .options(*options)
         .filter(GameRecord.id == record_id, GameRecord.owner_id == user.id)
         .one_or_none()
     )
@@ -52,6 +62,7 @@ def _owned_record(record_id: str, user: User, db: Session) -> GameRecord:
 def list_records(user: User = Depends(require_user), db: Session = Depends(get_db)):
     records = (
         db.query(GameRecord)
+        .options(summary_only())
         .filter(GameRecord.owner_id == user.id)
         .order_by(GameRecord.created_at.desc())
         .all()
@@ -75,13 +86,12 @@ def create_record(
         participants=payload.participants,
         seed=payload.seed,
         decisions=payload.decisions,
-        snapshot=payload.snapshot,
-        frames=payload.frames,
     )
+    store_payload(record, payload.snapshot, payload.frames)
     db.add(record)
     db.commit()
     db.refresh(record)
-    return record
+    return record_response(record)
 
 
 def _check_record(record: dict) -> dict:
@@ -162,22 +172,39 @@ def import_record(
         engine_version=record.get("engine"),
         participants=_participants(record),
         seed=str((record.get("replay") or {}).get("seed") or "") or None,
-        frames=record.get("frames"),
         meta=record.get("meta"),
     )
+    store_payload(stored, None, record.get("frames"))
     db.add(stored)
     db.commit()
     db.refresh(stored)
-    return stored
+    return record_response(stored)
 
 
 @router.get("/{record_id}", response_model=GameRecordResponse)
 def get_record(
     record_id: str,
+    frames: bool = True,
     user: User = Depends(require_user),
     db: Session = Depends(get_db),
 ):
-    return _owned_record(record_id, user, db)
+    """The whole record. `?frames=false` leaves the frames out (see /frames)."""
+    return record_response(_owned_record(record_id, user, db), include_frames=frames)
+
+
+@router.get("/{record_id}/frames", response_model=FrameWindow)
+def get_record_frames(
+    record_id: str,
+    start: int = Query(0, ge=0, alias="from"),
+    count: int = Query(FRAME_CHUNK, ge=1, le=8 * FRAME_CHUNK),
+    user: User = Depends(require_user),
+    db: Session = Depends(get_db),
+):
+    """A window of the record's frames, so playback can start before the rest
+    of a long game has arrived. `total` says when to stop asking."""
+    record = _owned_record(record_id, user, db, *without_payload())
+    frames, total = frame_window(db, record, start, count)
+    return FrameWindow(start=start, total=total, frames=frames)
 
 
 @router.patch("/{record_id}", response_model=GameRecordResponse)
@@ -192,7 +219,7 @@ def update_record(
     record.visibility = payload.visibility
     db.commit()
     db.refresh(record)
-    return record
+    return record_response(record)
 
 
 @router.delete("/{record_id}", status_code=204)
@@ -1,29 +1,30 @@
 from fastapi import APIRouter, Response
 from sqlalchemy.orm import Session
+from catalog_epoch import catalog_epoch
 from database import SessionLocal
 from models.base import Card
 import re
 
 router = APIRouter()
 
+# The sitemap lists every card, so it is rendered once per catalog epoch rather
+# than per request: {"epoch": ..., "xml": ...}.
+_cached = {"epoch": None, "xml": None}
+
 
 def slugify(name: str) -> str:
     return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
 
 
-@router.get("/sitemap.xml", response_class=Response)
-def sitemap():
-    db: Session = SessionLocal()
-    cards = db.query(Card).all()
-    db.close()
-
+def render_sitemap(cards) -> str:
+    """The sitemap XML for `cards`, (name, db_uuid) pairs."""
     urls = []
-    for card in cards:
-        if hasattr(card, "name") and card.name:
-            slug = slugify(card.name)
+    for name, db_uuid in cards:
+        if name:
+            slug = slugify(name)
             path = f"/card/{slug}"
         else:
-            path = f"/card/{card.db_uuid}"
+            path = f"/card/{db_uuid}"
 
         urls.append(f"""
         <url>
@@ -41,5 +42,18 @@ def sitemap():
       </url>
       {''.join(urls)}
     </urlset>"""
+    return xml.strip()
+
+
+@router.get("/sitemap.xml", response_class=Response)
+def sitemap():
+    epoch = catalog_epoch()
+    if _cached["epoch"] == epoch:
+        return Response(content=_cached["xml"], media_type="application/xml")
+
+    db: Session = SessionLocal()
+    cards = db.query(Card.name, Card.db_uuid).all()
+    db.close()
 
-    return Response(content=xml.strip(), media_type="application/xml")
+    _cached["epoch"], _cached["xml"] = epoch, render_sitemap(cards)
+    return Response(content=_cached["xml"], media_type="application/xml")
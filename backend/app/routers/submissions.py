@@ -1,19 +1,105 @@
 """
 Submissions router for missing cards and images
+
+Missing-image submissions are streamed to disk in chunks, hashed as they go
+and cut off past SRG_SUBMISSION_MAX_BYTES, so no upload is ever held whole
+in memory. A request whose Content-Length already says it is past that cap
+is refused before its body is read at all (UploadCapRoute); the count while
+copying catches the rest, such as chunked bodies that declare no length.
+The format is sniffed from the file's first bytes (the client's content
+type is not trusted), and its dimensions are read from its header: an image
+past card_identify.MAX_PIXELS (SRG_MAX_PHOTO_PIXELS) is refused before
+anything decodes it, since a tiny PNG can still be huge once decoded. The
+file is named by its sha256: two uploads can't collide, and the same
+file sent twice is stored once.
+
+Each saved image is then pHashed and compared against the other pending
+submissions and every card image (card_identify's index), so reviewers can
+see at a glance which are repeats and which card an image is probably for.
+Each submission's tags are appended to uploads/missing_images/index.jsonl,
+the reviewers' log, which the API only ever appends to. The pending pHashes
+it compares against are kept in pending.db alongside: a submission whose file
+has been removed (reviewed) is pruned from it, when it next comes up as a
+match and whenever a worker starts. Sending the very file that is already
+pending is reported as already_submitted rather than as a duplicate of
+itself. A background pool writes a WebP copy and a thumbnail of it (webp/
+and thumbnails/, same name) for the review page; the original is kept.
+
+Config via env:
+  SRG_SUBMISSION_MAX_BYTES  largest accepted image (default: 20 MiB)
+  SRG_SUBMISSION_WORKERS    threads making the review copies (default: 2)
 """
 
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Request,
+    UploadFile,
+    File,
+    Form,
+)
+from fastapi.routing import APIRoute
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
+import logging
 import os
+import sqlite3
+import tempfile
+from contextlib import closing
 from pathlib import Path
 import re
 from datetime import datetime
 
+from PIL import Image, ImageOps
+
+import card_identify
 from database import SessionLocal
 
-router = APIRouter()
+
+def format_size(n: int) -> str:
+    """A byte count for a person to read, rounded down: 20 MB, 512 KB."""
+    for unit, scale in (("MB", 1024 * 1024), ("KB", 1024)):
+        if n >= scale:
+            return f"{int(n * 10 / scale) / 10:g} {unit}"
+    return f"{n} bytes"
+
+
+def upload_too_large() -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"Image is too large (max {format_size(MAX_UPLOAD_BYTES)})",
+    )
+
+
+class UploadCapRoute(APIRoute):
+    """A route that refuses a request whose Content-Length is already past
+    MAX_UPLOAD_BYTES (plus MULTIPART_OVERHEAD_BYTES for the form around the
+    image), before Starlette spools its body to disk. save_upload's own count
+    remains the backstop for chunked bodies, which declare no length.
+    """
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def capped_handler(request: Request):
+            length = request.headers.get("content-length", "")
+            if (
+                length.isdigit()
+                and int(length) > MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES
+            ):
+                raise upload_too_large()
+            return await handler(request)
+
+        return capped_handler
+
+
+router = APIRouter(route_class=UploadCapRoute)
 
 
 def get_db():
@@ -32,6 +118,33 @@ MISSING_CARDS_DIR = UPLOADS_DIR / "missing_cards"
 MISSING_IMAGES_DIR = UPLOADS_DIR / "missing_images"
 MISSING_CARDS_DIR.mkdir(exist_ok=True)
 MISSING_IMAGES_DIR.mkdir(exist_ok=True)
+SUBMISSIONS_INDEX = MISSING_IMAGES_DIR / "index.jsonl"
+PENDING_DB = MISSING_IMAGES_DIR / "pending.db"
+REVIEW_WEBP_DIR = MISSING_IMAGES_DIR / "webp"
+REVIEW_THUMBS_DIR = MISSING_IMAGES_DIR / "thumbnails"
+
+MAX_UPLOAD_BYTES = int(os.environ.get("SRG_SUBMISSION_MAX_BYTES", 20 * 1024 * 1024))
+
+# Room in a request's Content-Length for the multipart framing and the
+# card_name field around the image itself.
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+# Uploads are copied to disk this much at a time, never held whole in memory.
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+REVIEW_THUMB_HEIGHT = 200
+
+# Pillow releases the GIL while it decodes, resizes and encodes, so threads
+# are enough to keep the review copies off the request path.
+_transcoder = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("SRG_SUBMISSION_WORKERS", 2)),
+    thread_name_prefix="submission-webp",
+)
+
+# pHash bit distances: a submission this close to a pending one is likely a
+# repeat of it; this close to a card image, that card is its probable target.
+DUPLICATE_DISTANCE = 6
+CARD_MATCH_DISTANCE = 10
 
 
 def sanitize_filename(filename: str) -> str:
@@ -44,6 +157,186 @@ def sanitize_filename(filename: str) -> str:
     return filename.lower()
 
 
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """The extension for an accepted image format, from its first bytes."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "jpg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+def save_upload(source, directory: Path):
+    """Copy an upload's file object into `directory` in chunks; returns
+    (file name, whether it is new): <sha256>.<ext>, and False when the same
+    file was already stored.
+
+    Raises HTTPException 413 past MAX_UPLOAD_BYTES or card_identify.MAX_PIXELS,
+    and 400 if it isn't a JPEG, PNG or WebP. Written through a temp file, so the review queue never
+    shows half a file.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    ext = None
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while chunk := source.read(UPLOAD_CHUNK_BYTES):
+                if ext is None:
+                    ext = sniff_image_type(chunk)
+                    if ext is None:
+                        raise HTTPException(
+                            status_code=400,
+                            detail="Invalid file type. Allowed: JPEG, PNG, WebP",
+                        )
+                size += len(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    raise upload_too_large()
+                digest.update(chunk)
+                f.write(chunk)
+        if ext is None:
+            raise HTTPException(status_code=400, detail="Image file is empty")
+        check_dimensions(tmp)
+        filename = f"{digest.hexdigest()[:32]}.{ext}"
+        # Same name, same bytes: a resubmission is already stored.
+        is_new = not (directory / filename).exists()
+        os.replace(tmp, directory / filename)
+        return filename, is_new
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def check_dimensions(path) -> None:
+    """Refuse an image too large to decode, from its header alone."""
+    try:
+        card_identify.open_photo(path).close()
+    except card_identify.PhotoTooLarge:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Image is too large (max {card_identify.MAX_PIXELS // 1_000_000} MP)",
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Could not read the image")
+
+
+def _save_webp(im: Image.Image, target: Path, quality: int) -> None:
+    target.parent.mkdir(exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=target.parent, suffix=".tmp")
+    os.close(fd)
+    try:
+        im.save(tmp, format="WEBP", quality=quality, method=4)
+        os.replace(tmp, target)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def make_review_copies(filepath: Path) -> None:
+    """WebP copy and thumbnail of a saved submission (runs in _transcoder)."""
+    webp = REVIEW_WEBP_DIR / f"{filepath.stem}.webp"
+    thumb = REVIEW_THUMBS_DIR / f"{filepath.stem}.webp"
+    if webp.exists() and thumb.exists():
+        return
+    try:
+        # One full-size image at a time: rotated in place, converted only if
+        # it has to be (and the original freed), then shrunk in place for the
+        # thumbnail, by whole-factor reduce() before the LANCZOS pass.
+        with Image.open(filepath) as src:
+            # Phone photos are often stored sideways with an EXIF rotation.
+            ImageOps.exif_transpose(src, in_place=True)
+            im = src if src.mode == "RGB" else src.convert("RGB")
+            if im is not src:
+                src.close()
+            _save_webp(im, webp, 85)
+            im.thumbnail((im.width, REVIEW_THUMB_HEIGHT), Image.Resampling.LANCZOS)
+            _save_webp(im, thumb, 80)
+    except Exception:
+        # Nobody is waiting on this; the original is kept for review anyway.
+        logging.getLogger(__name__).exception(
+            "Could not make review copies of %s", filepath.name
+        )
+
+
+def _pending_db():
+    conn = sqlite3.connect(PENDING_DB, timeout=10)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS pending (filename TEXT PRIMARY KEY, phash TEXT)"
+    )
+    return conn
+
+
+def prune_reviewed() -> None:
+    """Forget pending submissions whose file has been removed (reviewed)."""
+    with closing(_pending_db()) as conn, conn:
+        gone = [
+            (filename,)
+            for (filename,) in conn.execute("SELECT filename FROM pending")
+            if not (MISSING_IMAGES_DIR / filename).exists()
+        ]
+        conn.executemany("DELETE FROM pending WHERE filename = ?", gone)
+
+
+def _pending_duplicate(phash: int, filename: str):
+    """(distance, filename) of the nearest other pending submission within
+    DUPLICATE_DISTANCE, or None; matches already reviewed are pruned."""
+    with closing(_pending_db()) as conn, conn:
+        near = sorted(
+            (distance, other)
+            for other, value in conn.execute(
+                "SELECT filename, phash FROM pending WHERE filename != ?", (filename,)
+            )
+            if (distance := (phash ^ int(value, 16)).bit_count()) <= DUPLICATE_DISTANCE
+        )
+        for distance, other in near:
+            if (MISSING_IMAGES_DIR / other).exists():
+                return distance, other
+            conn.execute("DELETE FROM pending WHERE filename = ?", (other,))
+    return None
+
+
+def review_tags(filepath: Path) -> dict:
+    """pHash a saved submission; find the other pending submission it most
+    likely repeats and the card it is probably for."""
+    tags = {"phash": None, "duplicate_of": None, "probable_card": None}
+    try:
+        phash = card_identify.photo_phash(filepath)
+    except (card_identify.IdentifyUnavailable, ValueError):
+        return tags  # no imagehash here, or not an image we can read
+    tags["phash"] = f"{phash:016x}"
+
+    best = _pending_duplicate(phash, filepath.name)
+    if best:
+        tags["duplicate_of"] = {"filename": best[1], "phash_distance": best[0]}
+
+    try:
+        cards = card_identify.nearest_cards(phash, 1)
+    except card_identify.IdentifyUnavailable:
+        cards = []
+    if cards and cards[0][0] <= CARD_MATCH_DISTANCE:
+        distance, db_uuid = cards[0]
+        tags["probable_card"] = {"db_uuid": db_uuid, "phash_distance": distance}
+    return tags
+
+
+def record_submission(entry: dict) -> None:
+    # One short line per append, so concurrent workers' lines don't interleave.
+    with open(SUBMISSIONS_INDEX, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry) + "\n")
+    if entry.get("phash"):
+        with closing(_pending_db()) as conn, conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO pending (filename, phash) VALUES (?, ?)",
+                (entry["filename"], entry["phash"]),
+            )
+
+
+# Each worker starts from an index without the submissions reviewed meanwhile.
+prune_reviewed()
+
+
 class MissingCardSubmission(BaseModel):
     card_name: str
     card_type: str
@@ -95,7 +388,7 @@ async def submit_missing_image(
 ):
     """
     Submit a missing card image.
-    Saves the image with the card name.
+    Saves the image under its content hash; the card name goes in the index.
     """
     if not card_name or not card_name.strip():
         raise HTTPException(status_code=400, detail="Card name is required")
@@ -103,32 +396,35 @@ async def submit_missing_image(
     if not image:
         raise HTTPException(status_code=400, detail="Image file is required")
 
-    # Validate image type
-    allowed_types = {"image/jpeg", "image/jpg", "image/png", "image/webp"}
-    if image.content_type not in allowed_types:
-        raise HTTPException(
-            status_code=400, detail="Invalid file type. Allowed: JPEG, PNG, WebP"
+    # Save the image (its type is checked from its content while saving)
+    try:
+        filename, is_new = await run_in_threadpool(
+            save_upload, image.file, MISSING_IMAGES_DIR
         )
-
-    # Get file extension
-    ext = image.filename.split(".")[-1] if "." in image.filename else "jpg"
-
-    # Create filename
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    safe_name = sanitize_filename(card_name)
-    filename = f"{timestamp}_{safe_name}.{ext}"
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to save image: {str(e)}")
     filepath = MISSING_IMAGES_DIR / filename
+    _transcoder.submit(make_review_copies, filepath)
 
-    # Save the image
-    try:
-        contents = await image.read()
-        with open(filepath, "wb") as f:
-            f.write(contents)
-
-        return {
-            "success": True,
-            "message": "Image submission received. Thank you!",
+    tags = await run_in_threadpool(review_tags, filepath)
+    await run_in_threadpool(
+        record_submission,
+        {
             "filename": filename,
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to save image: {str(e)}")
+            "card_name": card_name,
+            "submitted_at": datetime.now().isoformat(),
+            "already_submitted": not is_new,
+            **tags,
+        },
+    )
+
+    return {
+        "success": True,
+        "message": "Image submission received. Thank you!",
+        "filename": filename,
+        "already_submitted": not is_new,
+        "duplicate_of": tags["duplicate_of"],
+        "probable_card": tags["probable_card"],
+    }
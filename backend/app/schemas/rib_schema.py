@@ -79,6 +79,8 @@ class GameRecordCreate(BaseModel):
 
 
 # Light row for lists — omits the bulky snapshot/frames/decisions payloads.
+# List queries load only these columns (record_storage.summary_only), so
+# a field added here must be a GameRecord column of the same name.
 class GameRecordSummary(BaseModel):
     id: str
     created_at: datetime
@@ -101,6 +103,17 @@ class GameRecordResponse(GameRecordSummary):
     decisions: Optional[List[int]] = None
     snapshot: Optional[str] = None
     frames: Optional[List[Dict[str, Any]]] = None
+    # How many frames the record has; set even when `frames` is left out so
+    # the viewer can page through them (GET .../frames).
+    frame_count: Optional[int] = None
+
+
+class FrameWindow(BaseModel):
+    """A slice of a record's frames: frames[start:start + len(frames)]."""
+
+    start: int
+    total: int
+    frames: List[Dict[str, Any]]
 
 
 class GameRecordUpdate(BaseModel):
@@ -130,3 +143,6 @@ class RecordValidation(BaseModel):
 
 class GameRecordListResponse(BaseModel):
     records: List[GameRecordSummary]
+    # Paged lists only (the public archive): pass back as `cursor` for the next
+    # page; null on the last one.
+    next_cursor: Optional[str] = None
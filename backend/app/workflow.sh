@@ -29,82 +29,32 @@ if [ $? -ne 0 ]; then
 fi
 echo ''
 
-# Step 3: Backup shared lists
-echo '💾 Step 2: Backing up shared lists...'
-python3 backup_shared_lists.py backup || echo '⚠️  Warning: Could not backup shared lists (may not exist yet)'
-echo ''
-
-# Step 4: Recreate main database
-# Rebuilds only the card-search tables (everything derived from cards.yaml).
-# The Run It Back tables are excluded from the drop — see models/base.py
-# RIB_MODELS — because accounts, decks and saved games are original data that
-# nothing regenerates. That is why there is no backup/restore pair for them.
-echo '🗄️  Step 3: Creating main database...'
-python3 create_db.py || echo '⚠️  Warning: Could not create main database'
-echo ''
-
-# Step 5: Restore shared lists
-echo '📦 Step 4: Restoring shared lists...'
-python3 backup_shared_lists.py restore || echo '⚠️  Warning: Could not restore shared lists'
-echo ''
-
-# Step 5b: Run It Back schema (additive: creates on first deploy, then no-ops)
-echo '🎮 Step 4b: Ensuring Run It Back tables...'
+# Step 3: Run It Back schema (additive: creates on first deploy, then no-ops)
+echo '🎮 Step 2: Ensuring Run It Back tables...'
 python3 create_rib_tables.py || echo '⚠️  Warning: Could not ensure Run It Back tables'
 echo ''
 
-# Step 6: Load cards into main database
-echo '📋 Step 5: Loading cards into main database...'
-python3 load_cards_from_yaml.py || echo '⚠️  Warning: Could not load cards to main database'
-echo ''
-
-# Step 7: Generate mobile database
-echo '📱 Step 6: Generating mobile database...'
-python3 create_mobile_db.py srg_cards_mobile.db cards.yaml
-if [ $? -ne 0 ]; then
-    echo ''
-    echo '❌ Mobile database generation failed!'
-    exit 1
-fi
-echo ''
-
-# Step 8: Generate manifests
-echo '📄 Step 7: Generating manifests...'
-python3 generate_db_manifest.py
+# Step 4: Build every output from one parse of cards.yaml
+# deploy_pipeline.py parses the catalog once and runs the stages side by side:
+#   - main database: `load_cards_from_yaml.py --sync` applies only the cards
+#     that changed since the last deploy (by per-card content hash), in one
+#     transaction, so the site never serves a partial catalog and nothing else
+#     (shared lists, Run It Back data) is touched. If the sync fails for any
+#     reason (first deploy, schema change, SQL error), it rebuilds the catalog
+#     in the cards_next schema and swaps it in atomically (catalog_swap.py);
+#     `python3 catalog_swap.py rollback` undoes that swap. Then it checks the
+#     database's card count, which the sitemap is generated from.
+#   - mobile database (srg_cards_mobile.db), then its db_manifest.json
+#   - images_manifest.json
+# It prints a per-stage timing summary, and fails if the main database, the
+# mobile database or its manifest could not be built.
+echo '📦 Step 3: Building databases and manifests...'
+python3 deploy_pipeline.py cards.yaml
 if [ $? -ne 0 ]; then
     echo ''
-    echo '❌ Database manifest generation failed!'
+    echo '❌ Database generation failed!'
     exit 1
 fi
-
-python3 generate_image_manifest.py
-if [ $? -ne 0 ]; then
-    echo ''
-    echo '⚠️  Warning: Image manifest generation failed (images may not sync properly)'
-fi
-echo ''
-
-# Step 9: Verify sitemap
-echo '🗺️  Step 8: Verifying sitemap...'
-CARD_COUNT=$(python3 -c "
-import sys
-sys.path.insert(0, '/home/dondo/srg_card_search_website/backend/app')
-from database import SessionLocal
-from models.base import Card
-db = SessionLocal()
-count = db.query(Card).count()
-db.close()
-print(count)
-")
-
-if [ $? -eq 0 ]; then
-    EXPECTED_URLS=$((CARD_COUNT + 1))  # Cards + homepage
-    echo "  ✓ Main database has $CARD_COUNT cards"
-    echo "  ✓ Sitemap will contain $EXPECTED_URLS URLs when served"
-    echo "  ℹ️  Sitemap is dynamically generated at: https://get-diced.com/sitemap.xml"
-else
-    echo '⚠️  Warning: Could not verify card count in database'
-fi
 echo ''
 
 echo '================================================'
@@ -113,11 +63,11 @@ echo '================================================'
 echo ''
 echo 'Summary:'
 echo '  - cards.yaml validated'
-echo '  - Main database updated with cards'
+echo '  - Main database synced with cards'
 echo '  - Mobile database generated: srg_cards_mobile.db'
 echo '  - Database manifest: db_manifest.json'
 echo '  - Image manifest: images_manifest.json'
-echo "  - Sitemap ready with $EXPECTED_URLS URLs"
+echo '  - Main database card count checked (sitemap source)'
 echo ''
 echo 'Next steps for SEO:'
 echo '  1. Sitemap updates automatically (no action needed)'
@@ -0,0 +1,92 @@
+"""
+@copyright Copyright 2025, Brandon Arrendondo
+See LICENSE.txt for details.
+
+card_identify ranking, against a card_hashes.db built from synthetic cards.
+"""
+
+import io
+import random
+import sqlite3
+
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+imagehash = pytest.importorskip("imagehash")
+np = pytest.importorskip("numpy")
+
+from PIL import Image, ImageDraw  # noqa: E402
+
+import card_identify  # noqa: E402
+
+SIZE = (750, 1050)
+
+# Cards (two of them busy) that each out-match card(37) on ORB for a resized
+# copy of it, 20 to 38 pHash bits away from it.
+DISTRACTORS = (103, 159, 296, 316)
+
+
+def card(seed: int) -> Image.Image:
+    """A synthetic card: a few flat shapes, and for even seeds dense noise and
+    text over them (ORB keypoints everywhere)."""
+    rnd = random.Random(seed)
+    im = Image.new("RGB", SIZE, tuple(rnd.randrange(256) for _ in range(3)))
+    draw = ImageDraw.Draw(im)
+    for _ in range(rnd.randint(3, 8)):
+        x, y = rnd.randrange(SIZE[0]), rnd.randrange(SIZE[1])
+        box = (x, y, x + rnd.randint(80, 400), y + rnd.randint(80, 400))
+        colour = tuple(rnd.randrange(256) for _ in range(3))
+        (draw.ellipse if rnd.random() < 0.5 else draw.rectangle)(box, fill=colour)
+    if seed % 2:
+        return im
+    pixels = np.array(im).astype(np.int16)
+    noise = np.random.RandomState(seed)
+    top = noise.randint(0, SIZE[1] - 500)
+    pixels[top : top + 400, 50:700] += noise.randint(-90, 90, (400, 650, 1))
+    im = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+    draw = ImageDraw.Draw(im)
+    for _ in range(40):
+        y, x = rnd.randrange(SIZE[1]), rnd.randrange(SIZE[0] - 200)
+        text = "".join(rnd.choice("ABCDEFGHIJKLMNOP0123456789") for _ in range(20))
+        draw.text((x, y), text, fill=(0, 0, 0))
+    return im
+
+
+@pytest.fixture
+def catalog(tmp_path, monkeypatch):
+    """card_hashes.db for a target card and distractors that collect more
+    chance ORB matches with a copy of it than it does, as generate_hashes.py
+    builds it; returns the cards by db_uuid."""
+    cards = {"target": card(37)}
+    cards.update((f"distractor-{seed}", card(seed)) for seed in DISTRACTORS)
+    db = tmp_path / "card_hashes.db"
+    conn = sqlite3.connect(db)
+    conn.execute(
+        "CREATE TABLE image_hashes (db_uuid TEXT PRIMARY KEY, phash TEXT NOT NULL, "
+        "orb_features BLOB, orb_nfeatures INTEGER)"
+    )
+    orb = cv2.ORB_create(nfeatures=100)
+    for db_uuid, im in cards.items():
+        _, descriptors = orb.detectAndCompute(np.asarray(im.convert("L")), None)
+        conn.execute(
+            "INSERT INTO image_hashes VALUES (?, ?, ?, 100)",
+            (db_uuid, str(imagehash.phash(im)), descriptors.tobytes()),
+        )
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(card_identify, "HASHES_DB", db)
+    monkeypatch.setattr(card_identify, "_index", None)
+    return cards
+
+
+def test_exact_copy_beats_busy_distractors(catalog):
+    buf = io.BytesIO()
+    catalog["target"].resize((600, 840)).save(buf, "PNG")
+
+    results = card_identify.identify(buf.getvalue(), limit=5)
+
+    assert results[0]["db_uuid"] == "target"
+    assert results[0]["phash_distance"] <= 2
+    # The distractors collect more chance ORB matches than the copy does:
+    # ranked by ORB alone it would not have come first.
+    assert max(r["orb_score"] for r in results[1:]) > results[0]["orb_score"]
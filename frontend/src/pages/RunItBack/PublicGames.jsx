@@ -1,6 +1,7 @@
 // Run It Back — public games archive. Browsable and replayable by ANYONE, no
 // login (this route is outside RequireAuth). Lists records marked public via
 // the no-login /api/games/public endpoint; each links to the public replay.
+// The endpoint is keyset-paged: "Load more" passes back its next_cursor.
 
 import { useEffect, useState } from "react";
 import { Link } from "react-router-dom";
@@ -18,21 +19,42 @@ function matchupLine(rec) {
   return `${winner} def. ${loser}`;
 }
 
+const pageUrl = (cursor) =>
+  cursor ? `/api/games/public?cursor=${encodeURIComponent(cursor)}` : "/api/games/public";
+
 export default function PublicGames() {
   const [records, setRecords] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState(null);
 
   useEffect(() => {
     let alive = true;
     api
-      .get("/api/games/public")
-      .then((d) => alive && setRecords(d.records ?? []))
+      .get(pageUrl(null))
+      .then((d) => {
+        if (!alive) return;
+        setRecords(d.records ?? []);
+        setNextCursor(d.next_cursor ?? null);
+      })
       .catch((e) => alive && (setError(String(e?.detail ?? e?.message ?? e)), setRecords([])));
     return () => {
       alive = false;
     };
   }, []);
 
+  const loadMore = () => {
+    setLoadingMore(true);
+    api
+      .get(pageUrl(nextCursor))
+      .then((d) => {
+        setRecords((prev) => [...prev, ...(d.records ?? [])]);
+        setNextCursor(d.next_cursor ?? null);
+      })
+      .catch((e) => setError(String(e?.detail ?? e?.message ?? e)))
+      .finally(() => setLoadingMore(false));
+  };
+
   return (
     <div className="mx-auto max-w-3xl p-4">
       <div className="mb-4 flex items-center justify-between">
@@ -81,6 +103,17 @@ export default function PublicGames() {
           ))}
         </ul>
       )}
+
+      {nextCursor && (
+        <button
+          type="button"
+          onClick={loadMore}
+          disabled={loadingMore}
+          className="mt-4 w-full rounded border border-gray-600 py-2 text-sm text-gray-200 hover:bg-gray-800 disabled:opacity-50"
+        >
+          {loadingMore ? "Loading…" : "Load more"}
+        </button>
+      )}
     </div>
   );
 }
@@ -12,7 +12,9 @@
 //   each decision and highlights the move that was played.
 //
 // Frames win when present: they say what actually happened, whereas
-// re-simulation says what today's engine would produce.
+// re-simulation says what today's engine would produce. They are fetched in
+// windows (GET .../frames), so a long game starts playing as soon as its first
+// window arrives and the rest streams in behind the viewer.
 
 import { useEffect, useState } from "react";
 import { Link, useParams } from "react-router-dom";
@@ -39,6 +41,26 @@ async function frameCardIndex(frames) {
   }
 }
 
+const FRAME_WINDOW = 128;
+
+// Append frame windows after the first until `total` is reached, resolving each
+// window's cards as it lands. Stops quietly if the viewer unmounts.
+async function streamRemainingFrames(path, first, isAlive, setState) {
+  let from = first.frames.length;
+  while (from < first.total && isAlive()) {
+    const w = await api.get(`${path}/frames?from=${from}&count=${FRAME_WINDOW}`);
+    if (!w.frames.length) break;
+    from += w.frames.length;
+    const more = await frameCardIndex(w.frames);
+    if (!isAlive()) return;
+    setState((s) => ({
+      ...s,
+      frames: [...s.frames, ...w.frames],
+      cards: new Map([...s.cards, ...more]),
+    }));
+  }
+}
+
 // Load the record and turn it into a pageable sequence.
 // `publicMode` reads from the no-login public archive instead of the owner API.
 function useReplay(recordId, publicMode) {
@@ -48,10 +70,14 @@ function useReplay(recordId, publicMode) {
     (async () => {
       try {
         const path = publicMode ? `/api/games/public/${recordId}` : `/api/rib/games/${recordId}`;
-        const record = await api.get(path);
-        if (record.frames?.length) {
-          const cards = await frameCardIndex(record.frames);
-          if (alive) setState({ status: "frames", frames: record.frames, record, cards });
+        const record = await api.get(`${path}?frames=false`);
+        if (record.frame_count) {
+          const first = await api.get(`${path}/frames?from=0&count=${FRAME_WINDOW}`);
+          const cards = await frameCardIndex(first.frames);
+          if (!alive) return;
+          setState({ status: "frames", frames: first.frames, record, cards });
+          // A failed later window must not take down what is already playing.
+          await streamRemainingFrames(path, first, () => alive, setState).catch(() => {});
           return;
         }
         if (!record.snapshot) {
@@ -9,17 +9,12 @@ cards_without_rules.py
 import sys
 import argparse
 import logging
-import yaml
+from cards_yaml import read_cards
 
 __version__ = "%(prog)s 1.0.0 (Rel: 04 Sep 2025)"
 default_log_format = "%(filename)s:%(levelname)s:%(asctime)s] %(message)s"
 
 
-def read_yaml(path: str):
-    with open(path) as f:
-        return yaml.safe_load(f)
-
-
 def main(argv):
     parser = argparse.ArgumentParser()
     parser.add_argument("filepath")
@@ -43,7 +38,7 @@ def main(argv):
     else:
         logging.getLogger().setLevel(logging.INFO)
 
-    y = read_yaml(args.filepath)
+    y = read_cards(args.filepath)
     comp_without_rules = []
     deck_card_without_rules = []
     for item in y:
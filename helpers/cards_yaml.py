@@ -0,0 +1,21 @@
+"""
+cards_yaml.py
+:author: Brandon Arrendondo
+
+:license: MIT
+
+cards.yaml loading for the helper scripts. They use backend/app's
+card_catalog rather than a loader of their own, so the choice of YAML loader
+(and the parse cache) lives in one place for the whole repo.
+"""
+
+import sys
+from pathlib import Path
+
+_APP_DIR = Path(__file__).resolve().parent.parent / "backend" / "app"
+if str(_APP_DIR) not in sys.path:
+    sys.path.append(str(_APP_DIR))
+
+from card_catalog import parse_yaml, read_cards  # noqa: E402
+
+__all__ = ["parse_yaml", "read_cards"]
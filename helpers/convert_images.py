@@ -4,23 +4,38 @@ Convert source images to WebP fullsize + thumbnails, named by YAML db_uuid.
 
 - Map filenames -> card names -> YAML db_uuid (exact slug match, then fuzzy).
 - Write outputs to OUT/fullsize/xx/{uuid}.webp and OUT/thumbnails/xx/{uuid}.webp
-- Convert only if missing or source is newer.
+- Each source is decoded once for all three outputs, and sources are encoded
+  in parallel across --jobs worker processes (default: all cores).
+- Convert only if an output is missing, or its source's content (sha256) or
+  encode settings changed since it was built. OUT/.convert_state.json records
+  what each output was built from; touching a source without changing it
+  does not re-render it.
 - Never deletes source files.
 
-Deps: pip install pillow pyyaml rapidfuzz
+--method is the WebP encoder effort (0-6, default 6, the smallest files);
+--method 4 encodes several times faster for slightly larger files. Changing
+it re-renders everything.
+
+Deps: pip install pillow pyyaml rapidfuzz (tqdm optional, for a progress bar)
 """
 
 from __future__ import annotations
 import argparse
 import csv
+import hashlib
+import json
+import os
 import re
 import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
-import yaml
 from PIL import Image
 
+from cards_yaml import read_cards
+
 try:
     from rapidfuzz import process, fuzz
 
@@ -29,8 +44,17 @@ except Exception:
     # Fallback to difflib if rapidfuzz not available (slower/less accurate)
     HAVE_RAPIDFUZZ = False
 
+try:
+    from tqdm import tqdm
+
+    HAVE_TQDM = True
+except Exception:
+    # Without tqdm each line is prefixed with a done/total count instead.
+    HAVE_TQDM = False
 
 IMG_EXTS = {".png", ".jpg", ".jpeg", ".webp", ".bmp", ".tif", ".tiff"}
+STATE_FILE = ".convert_state.json"
+HASH_CHUNK = 1 << 20
 
 
 def parse_args() -> argparse.Namespace:
@@ -66,6 +90,21 @@ def parse_args() -> argparse.Namespace:
         default=75,
         help="Mobile WebP quality (default 75)",
     )
+    ap.add_argument(
+        "--method",
+        type=int,
+        default=6,
+        choices=range(7),
+        metavar="0-6",
+        help="WebP encoder effort; lower is faster, larger (default 6)",
+    )
+    ap.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Worker processes for encoding (default: CPU count)",
+    )
     ap.add_argument(
         "--cutoff",
         type=float,
@@ -88,7 +127,7 @@ def parse_args() -> argparse.Namespace:
 
 
 def load_cards(yaml_path: Path) -> List[dict]:
-    data = yaml.safe_load(yaml_path.read_text(encoding="utf-8"))
+    data = read_cards(yaml_path)
     if isinstance(data, dict) and "cards" in data:
         items = data["cards"]
     elif isinstance(data, list):
@@ -188,156 +227,301 @@ def needs_build(src: Path, dst: Path) -> bool:
     return src.stat().st_mtime > dst.stat().st_mtime
 
 
-def save_full(src: Path, dst: Path, quality: int, dry: bool) -> None:
-    dst.parent.mkdir(parents=True, exist_ok=True)
-    if dry:
-        print(f"[DRY] FULL  -> {dst}")
-        return
-    with Image.open(src) as im:
-        im = im.convert("RGB")
-        im.save(dst, format="WEBP", quality=quality, method=6)
-
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        while chunk := f.read(HASH_CHUNK):
+            h.update(chunk)
+    return h.hexdigest()
 
-def save_thumb(src: Path, dst: Path, height: int, quality: int, dry: bool) -> None:
-    dst.parent.mkdir(parents=True, exist_ok=True)
-    if dry:
-        print(f"[DRY] THUMB -> {dst}")
-        return
-    with Image.open(src) as im:
-        im = im.convert("RGB")
-        w, h = im.size
-        if h == 0:
-            new_h = height
-            new_w = height
-        else:
-            new_h = height
-            new_w = int(round(w * (height / float(h))))
-        thumb = im.resize((max(1, new_w), max(1, new_h)), Image.Resampling.LANCZOS)
-        thumb.save(dst, format="WEBP", quality=quality, method=6)
-
-
-def save_mobile(src: Path, dst: Path, quality: int, dry: bool) -> None:
-    """Save mobile-optimized version (same resolution as fullsize, lower quality)."""
-    dst.parent.mkdir(parents=True, exist_ok=True)
-    if dry:
-        print(f"[DRY] MOBILE -> {dst}")
-        return
-    with Image.open(src) as im:
-        im = im.convert("RGB")
-        im.save(dst, format="WEBP", quality=quality, method=6)
 
+def output_params(settings: dict) -> Dict[str, str]:
+    """What each derivative was encoded with; a change re-renders it."""
+    m = settings["method"]
+    return {
+        "full": f"q{settings['quality']}m{m}",
+        "thumb": f"h{settings['thumb_height']}q{settings['thumb_quality']}m{m}",
+        "mobile": f"q{settings['mobile_quality']}m{m}",
+    }
 
-# ---------- Main ----------
 
+def make_thumb(im: Image.Image, height: int) -> Image.Image:
+    w, h = im.size
+    if h == 0:
+        new_h = height
+        new_w = height
+    else:
+        new_h = height
+        new_w = int(round(w * (height / float(h))))
+    return im.resize((max(1, new_w), max(1, new_h)), Image.Resampling.LANCZOS)
 
-def main() -> None:
-    args = parse_args()
 
-    if not args.yaml.is_file():
-        print(f"ERROR: YAML not found: {args.yaml}", file=sys.stderr)
-        sys.exit(2)
-    if not args.src.is_dir():
-        print(f"ERROR: src not a directory: {args.src}", file=sys.stderr)
-        sys.exit(2)
+def save_webp(im: Image.Image, dst: Path, quality: int, method: int) -> None:
+    # Write-then-rename, so an interrupted run never leaves a truncated image
+    # that looks up to date.
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=dst.parent, suffix=".tmp")
+    os.close(fd)
+    try:
+        im.save(tmp, format="WEBP", quality=quality, method=method)
+        os.replace(tmp, dst)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def render(job: dict) -> dict:
+    """Build whichever of one source's derivatives are out of date.
+
+    Runs in a worker process. An output is rebuilt if it is missing, or if
+    the source's sha256 or the encode settings differ from what it was last
+    built from (its stamp). With no stamps yet (outputs from before the state
+    file existed) the old mtime rule decides instead, so upgrading does not
+    re-render the whole library. The source is decoded once for all outputs.
+    """
+    src: Path = job["src"]
+    settings = job["settings"]
+    previous = job["stamps"]
+    digest = file_sha256(src)
+
+    stamps = {}
+    todo = []
+    for kind, (dst, params) in job["outputs"].items():
+        stamps[kind] = f"{digest}:{params}"
+        if not dst.exists():
+            todo.append(kind)
+        elif previous is None:
+            if needs_build(src, dst):
+                todo.append(kind)
+        elif previous.get(kind) != stamps[kind]:
+            todo.append(kind)
+
+    if todo and settings["dry_run"]:
+        for kind in todo:
+            print(f"[DRY] {kind.upper():<6} -> {job['outputs'][kind][0]}")
+    elif todo:
+        method = settings["method"]
+        with Image.open(src) as im:
+            im = im.convert("RGB")
+            for kind in todo:
+                dst = job["outputs"][kind][0]
+                if kind == "thumb":
+                    thumb = make_thumb(im, settings["thumb_height"])
+                    save_webp(thumb, dst, settings["thumb_quality"], method)
+                elif kind == "full":
+                    save_webp(im, dst, settings["quality"], method)
+                else:
+                    save_webp(im, dst, settings["mobile_quality"], method)
+    return {"uuid": job["uuid"], "stamps": stamps, "built": todo}
+
+
+def load_state(out_root: Path) -> dict:
+    """uuid -> {output kind: stamp} from the last run, or {} if there is none."""
+    try:
+        with (out_root / STATE_FILE).open(encoding="utf-8") as f:
+            return json.load(f).get("outputs", {})
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(out_root: Path, outputs: dict) -> None:
+    fd, tmp = tempfile.mkstemp(dir=out_root, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "outputs": outputs}, f, separators=(",", ":"))
+        os.replace(tmp, out_root / STATE_FILE)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def run_jobs(jobs: List[dict], workers: int):
+    """Yield (job, result or exception) as jobs finish, in parallel if asked."""
+    if workers <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            try:
+                yield job, render(job)
+            except Exception as e:
+                yield job, e
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(render, job): job for job in jobs}
+        try:
+            for fut in as_completed(futures):
+                try:
+                    yield futures[fut], fut.result()
+                except Exception as e:
+                    yield futures[fut], e
+        finally:
+            for fut in futures:
+                fut.cancel()
 
-    cards = load_cards(args.yaml)
-    slug_index, names = build_indices(cards)
 
-    images = [
-        p for p in args.src.rglob("*") if p.is_file() and p.suffix.lower() in IMG_EXTS
-    ]
-    images.sort()
+# ---------- Main ----------
 
-    out_full_root = args.out / "fullsize"
-    out_thumb_root = args.out / "thumbnails"
-    out_mobile_root = args.out / "mobile"
-    out_full_root.mkdir(parents=True, exist_ok=True)
-    out_thumb_root.mkdir(parents=True, exist_ok=True)
-    out_mobile_root.mkdir(parents=True, exist_ok=True)
 
-    if args.report:
-        args.report.parent.mkdir(parents=True, exist_ok=True)
+def output_roots(out: Path) -> Dict[str, Path]:
+    return {
+        "full": out / "fullsize",
+        "thumb": out / "thumbnails",
+        "mobile": out / "mobile",
+    }
 
-    mapped = 0
-    skipped = 0
-    converted = 0
 
-    report_rows: List[List[str]] = []
-    if args.report:
-        report_rows.append(
-            ["source", "guess", "matched_name", "uuid", "score", "action"]
-        )
+def plan_jobs(images, args, cards, settings, state, counts, report_rows):
+    """Match each source to a card and build its render job.
 
+    Matching is cheap and stays in this process; only the encoding fans out.
+    Sources that match nothing are counted as unmatched, and a second source
+    for an already-claimed card as a duplicate.
+    """
+    slug_index, names = cards
+    params = output_params(settings)
+    out_roots = output_roots(args.out)
+    jobs: List[dict] = []
+    claimed: Dict[str, Path] = {}
     for src in images:
         guess = filename_to_guess(src, strip_leading_num=args.strip_leading_num)
         card, score, mname = match_card(guess, slug_index, names, cutoff=args.cutoff)
+        uuid = str(card["db_uuid"]).strip() if card else ""
+        row = [str(src), guess, mname, uuid, f"{score:.2f}"]
 
-        if not card:
-            print(f"[SKIP] No match: {src.name} | guess='{guess}' score={score:.2f}")
-            skipped += 1
-            if args.report:
-                report_rows.append(
-                    [str(src), guess, mname, "", f"{score:.2f}", "NO_MATCH"]
-                )
-            continue
-
-        uuid = str(card["db_uuid"]).strip()
-        if not uuid:
-            print(f"[SKIP] Match has no db_uuid: {mname}")
-            skipped += 1
-            if args.report:
-                report_rows.append(
-                    [str(src), guess, mname, "", f"{score:.2f}", "NO_UUID"]
+        if not card or not uuid:
+            if not card:
+                print(
+                    f"[SKIP] No match: {src.name} | guess='{guess}' score={score:.2f}"
                 )
+            else:
+                print(f"[SKIP] Match has no db_uuid: {mname}")
+            counts["unmatched"] += 1
+            report_rows.append(row + ["NO_UUID" if card else "NO_MATCH"])
             continue
 
-        shard = uuid[:2]
-        dst_full = out_full_root / shard / f"{uuid}.webp"
-        dst_thumb = out_thumb_root / shard / f"{uuid}.webp"
-        dst_mobile = out_mobile_root / shard / f"{uuid}.webp"
-
-        action = []
-        if needs_build(src, dst_full):
-            save_full(src, dst_full, quality=args.quality, dry=args.dry_run)
-            action.append("FULL")
-            converted += 1
-        if needs_build(src, dst_thumb):
-            save_thumb(
-                src,
-                dst_thumb,
-                height=args.thumb_height,
-                quality=args.thumb_quality,
-                dry=args.dry_run,
+        # Two sources for one card would race for the same outputs; the first
+        # (in sorted order) wins, as it did when the loop was serial.
+        if uuid in claimed:
+            print(
+                f"[SKIP] {src.name} matches '{mname}', already from {claimed[uuid].name}"
             )
-            action.append("THUMB")
-            converted += 1
-        if needs_build(src, dst_mobile):
-            save_mobile(src, dst_mobile, quality=args.mobile_quality, dry=args.dry_run)
-            action.append("MOBILE")
-            converted += 1
-
-        mapped += 1
-        act = "+".join(action) if action else "SKIP_UP_TO_DATE"
-        print(
-            f"[OK] {src.name} -> {shard}/{uuid}.webp | match='{mname}' ({score:.2f}) | {act}"
+            counts["duplicates"] += 1
+            report_rows.append(row + ["DUPLICATE"])
+            continue
+        claimed[uuid] = src
+
+        jobs.append(
+            {
+                "src": src,
+                "uuid": uuid,
+                "guess": guess,
+                "name": mname,
+                "score": score,
+                "settings": settings,
+                "stamps": state.get(uuid),
+                "outputs": {
+                    kind: (root / uuid[:2] / f"{uuid}.webp", params[kind])
+                    for kind, root in out_roots.items()
+                },
+            }
         )
+    return jobs
+
+
+def convert_all(jobs, args, state, counts, report_rows) -> None:
+    """Render the jobs across args.jobs workers, saving state as they finish."""
+    workers = 1 if args.dry_run else max(1, args.jobs)
+    bar = tqdm(total=len(jobs), unit="img") if HAVE_TQDM else None
+    log = bar.write if bar else print
+    done = 0
+    try:
+        for job, result in run_jobs(jobs, workers):
+            done += 1
+            if bar:
+                bar.update()
+            src, uuid = job["src"], job["uuid"]
+            where = f"{uuid[:2]}/{uuid}.webp"
+            if isinstance(result, Exception):
+                counts["failed"] += 1
+                act = "ERROR"
+                log(f"[ERROR] {src.name} -> {where} | {result}")
+            else:
+                counts["mapped"] += 1
+                counts["converted"] += len(result["built"])
+                act = "+".join(k.upper() for k in result["built"]) or "SKIP_UP_TO_DATE"
+                if not args.dry_run:
+                    state[uuid] = result["stamps"]
+                prefix = "" if bar else f"[{done}/{len(jobs)}] "
+                log(
+                    f"{prefix}[OK] {src.name} -> {where} | "
+                    f"match='{job['name']}' ({job['score']:.2f}) | {act}"
+                )
+            report_rows.append(
+                [str(src), job["guess"], job["name"], uuid, f"{job['score']:.2f}", act]
+            )
+    finally:
+        if bar:
+            bar.close()
+        # Also on Ctrl-C: what finished stays finished for the next run.
+        if not args.dry_run:
+            save_state(args.out, state)
 
-        if args.report:
-            report_rows.append([str(src), guess, mname, uuid, f"{score:.2f}", act])
 
+def print_summary(args, considered: int, counts: dict, report_rows) -> None:
     print("\nSummary:")
-    print(f"  Considered:      {len(images)}")
-    print(f"  Mapped:          {mapped}")
-    print(f"  Converted files: {converted}")
-    print(f"  Unmatched:       {skipped}")
+    print(f"  Considered:      {considered}")
+    print(f"  Mapped:          {counts['mapped']}")
+    print(f"  Converted files: {counts['converted']}")
+    print(f"  Unmatched:       {counts['unmatched']}")
+    print(f"  Duplicates:      {counts['duplicates']}")
+    print(f"  Failed:          {counts['failed']}")
     print(f"  Output root:     {args.out}")
 
     if args.report:
+        args.report.parent.mkdir(parents=True, exist_ok=True)
         with args.report.open("w", newline="", encoding="utf-8") as f:
             w = csv.writer(f)
+            w.writerow(["source", "guess", "matched_name", "uuid", "score", "action"])
             w.writerows(report_rows)
         print(f"  Report:          {args.report}")
 
 
+def main() -> None:
+    args = parse_args()
+
+    if not args.yaml.is_file():
+        print(f"ERROR: YAML not found: {args.yaml}", file=sys.stderr)
+        sys.exit(2)
+    if not args.src.is_dir():
+        print(f"ERROR: src not a directory: {args.src}", file=sys.stderr)
+        sys.exit(2)
+
+    cards = build_indices(load_cards(args.yaml))
+
+    images = [
+        p for p in args.src.rglob("*") if p.is_file() and p.suffix.lower() in IMG_EXTS
+    ]
+    images.sort()
+
+    for root in output_roots(args.out).values():
+        root.mkdir(parents=True, exist_ok=True)
+
+    settings = {
+        "quality": args.quality,
+        "thumb_height": args.thumb_height,
+        "thumb_quality": args.thumb_quality,
+        "mobile_quality": args.mobile_quality,
+        "method": args.method,
+        "dry_run": args.dry_run,
+    }
+    state = load_state(args.out)
+    counts = dict.fromkeys(
+        ("mapped", "converted", "unmatched", "duplicates", "failed"), 0
+    )
+    report_rows: List[List[str]] = []
+
+    jobs = plan_jobs(images, args, cards, settings, state, counts, report_rows)
+    convert_all(jobs, args, state, counts, report_rows)
+    print_summary(args, len(images), counts, report_rows)
+
+
 if __name__ == "__main__":
     main()
@@ -2,27 +2,38 @@
 """
 find_similar.py
 Find similar images based on pHash and ORB features from SQLite database
+
+pHashes are parsed once and matched with multi-index hashing (see
+candidate_pairs), so only the few pairs within the threshold are ever
+compared, rather than all ~n^2/2; ORB runs on those alone.
+
+The ORB checks run in a process pool (--workers). The descriptors they need
+are copied once into a shared memory block that every worker maps, and each
+worker reuses one matcher: brute force by default, or --matcher flann for an
+LSH index per train card, faster for large candidate sets but approximate.
 """
 
+import os
 import sqlite3
 import numpy as np
 import cv2
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import combinations
+from multiprocessing import shared_memory
 
-
-def hamming_distance(hash1, hash2):
-    """Calculate Hamming distance between two hex strings."""
-    if len(hash1) != len(hash2):
-        return float("inf")
-
-    xor_result = int(hash1, 16) ^ int(hash2, 16)
-    return bin(xor_result).count("1")
+# ORB is only compared for pairs at most this far apart in pHash.
+ORB_PHASH_DISTANCE = 5
+ORB_DESCRIPTOR_BYTES = 32
+FLANN_INDEX_LSH = 6
 
 
-def orb_similarity(features1, features2, threshold=0.75):
+def orb_similarity(features1, features2, threshold=0.75, matcher=None):
     """
     Calculate ORB feature similarity using brute force matcher.
 
+    Pass a BFMatcher(NORM_HAMMING) as `matcher` to reuse one across calls.
+
     Returns:
         Number of good matches
     """
@@ -30,13 +41,18 @@ def orb_similarity(features1, features2, threshold=0.75):
         return 0
 
     # Features are already numpy arrays from database
-    bf = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=False)
+    bf = matcher or cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=False)
 
     try:
         matches = bf.knnMatch(features1, features2, k=2)
     except Exception:
         return 0
 
+    return _good_matches(matches, threshold)
+
+
+def _good_matches(matches, threshold=0.75):
+    """Count knnMatch results that pass the ratio test."""
     # Apply ratio test (Lowe's ratio test)
     good_matches = 0
     for match_pair in matches:
@@ -71,138 +87,318 @@ def load_cards_from_db(db_path):
     return cards
 
 
-def _compare_pair(card1, card2, phash_threshold, orb_threshold):
-    """Compare two cards, returning (phash_match, orb_match, orb_checked).
+def parse_phashes(cards):
+    """Parse each card's hex pHash to an int once, up front.
 
-    phash_match/orb_match are dicts when the pair qualifies, else None.
-    orb_checked is True whenever an ORB comparison was actually performed.
+    Returns (card index, hash length in bits, value) for every card that has
+    a pHash.
     """
-    if not (card1["phash"] and card2["phash"]):
-        return None, None, False
-
-    distance = hamming_distance(card1["phash"], card2["phash"])
-    if distance > phash_threshold:
-        return None, None, False
-
-    phash_match = {
-        "uuid1": card1["uuid"],
-        "uuid2": card2["uuid"],
-        "phash1": card1["phash"],
-        "phash2": card2["phash"],
-        "distance": distance,
-    }
-
-    # ONLY check ORB if pHash is similar (distance <= 5)
-    orb_match = None
-    orb_checked = (
-        distance <= 5
-        and card1["orb_features"] is not None
-        and card2["orb_features"] is not None
-    )
-    if orb_checked:
-        orb_score = orb_similarity(card1["orb_features"], card2["orb_features"])
-        if orb_score >= orb_threshold:
-            orb_match = {
+    return [
+        (i, len(card["phash"]) * 4, int(card["phash"], 16))
+        for i, card in enumerate(cards)
+        if card["phash"]
+    ]
+
+
+def candidate_pairs(hashes, max_distance):
+    """Find every pair of hashes within max_distance bits of each other.
+
+    Multi-index hashing: split each hash into max_distance + 1 blocks. Two
+    hashes that differ in at most max_distance bits must agree exactly on at
+    least one block (pigeonhole), so only hashes that share a (block, value)
+    bucket are compared, instead of every pair. Hashes of different lengths
+    never match.
+
+    `hashes` is parse_phashes' output. Returns sorted ((i, j), distance) with
+    i < j.
+    """
+    by_length = defaultdict(list)
+    for i, bits, value in hashes:
+        by_length[bits].append((i, value))
+
+    pairs = {}
+    blocks = max_distance + 1
+    for bits, group in by_length.items():
+        if blocks > bits:
+            # Too few bits to split; any two hashes may be within range.
+            candidates = combinations(group, 2)
+        else:
+            bounds = [bits * k // blocks for k in range(blocks + 1)]
+            buckets = defaultdict(list)
+            for i, value in group:
+                for k in range(blocks):
+                    lo, hi = bounds[k], bounds[k + 1]
+                    buckets[k, (value >> lo) & ((1 << (hi - lo)) - 1)].append(
+                        (i, value)
+                    )
+            candidates = (
+                pair for bucket in buckets.values() for pair in combinations(bucket, 2)
+            )
+        # Groups and buckets are filled in index order, so i < j.
+        for (i, a), (j, b) in candidates:
+            distance = (a ^ b).bit_count()
+            if distance <= max_distance:
+                pairs[i, j] = distance
+    return sorted(pairs.items())
+
+
+def _compare_all_pairs(cards, phash_threshold):
+    """Group pHash matches by distance and pick the pairs to check with ORB.
+
+    Only pairs within phash_threshold (from candidate_pairs) are looked at,
+    in the same order a comparison of every pair would find them. Returns
+    (phash_matches, orb_pairs) with orb_pairs as (i, j, distance).
+    """
+    phash_matches = defaultdict(list)
+    orb_pairs = []
+
+    pairs = candidate_pairs(parse_phashes(cards), phash_threshold)
+    print(f"pHash pairs within distance {phash_threshold}: {len(pairs)}")
+
+    for (i, j), distance in pairs:
+        card1, card2 = cards[i], cards[j]
+        phash_matches[distance].append(
+            {
                 "uuid1": card1["uuid"],
                 "uuid2": card2["uuid"],
-                "orb_score": orb_score,
-                "phash_distance": distance,
+                "phash1": card1["phash"],
+                "phash2": card2["phash"],
+                "distance": distance,
             }
+        )
+        # ONLY check ORB if pHash is similar (distance <= 5)
+        if (
+            distance <= ORB_PHASH_DISTANCE
+            and card1["orb_features"] is not None
+            and card2["orb_features"] is not None
+        ):
+            orb_pairs.append((i, j, distance))
+
+    return phash_matches, orb_pairs
+
+
+# ---------- ORB verification (worker processes) ----------
+
+# Per worker process: a view of the shared descriptor table, each card's rows
+# in it, and one matcher reused for every pair.
+_worker = {}
+
+
+def _make_matcher(kind):
+    if kind == "flann":
+        return cv2.FlannBasedMatcher(
+            {
+                "algorithm": FLANN_INDEX_LSH,
+                "table_number": 6,
+                "key_size": 12,
+                "multi_probe_level": 1,
+            },
+            {"checks": 50},
+        )
+    return cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=False)
 
-    return phash_match, orb_match, orb_checked
 
+def _init_orb_worker(shm_name, total_rows, spans, kind):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _worker["shm"] = shm  # keeps the mapping alive
+    _worker["table"] = np.ndarray(
+        (total_rows, ORB_DESCRIPTOR_BYTES), dtype=np.uint8, buffer=shm.buf
+    )
+    _worker["spans"] = spans
+    _worker["kind"] = kind
+    _worker["matcher"] = _make_matcher(kind)
 
-def _compare_all_pairs(cards, phash_threshold, orb_threshold):
-    """Compare every card pair, grouping pHash matches and collecting ORB matches."""
-    phash_matches = defaultdict(list)
-    orb_matches = []
-    total_comparisons = len(cards) * (len(cards) - 1) // 2
-    current = 0
-    orb_checks = 0
-
-    for i, card1 in enumerate(cards):
-        for card2 in cards[i + 1 :]:
-            current += 1
-            if current % 10000 == 0:
-                print(
-                    f"Progress: {current}/{total_comparisons} (ORB checks: {orb_checks})"
-                )
-
-            phash_match, orb_match, orb_checked = _compare_pair(
-                card1, card2, phash_threshold, orb_threshold
-            )
-            if phash_match:
-                phash_matches[phash_match["distance"]].append(phash_match)
-            if orb_match:
-                orb_matches.append(orb_match)
-            if orb_checked:
-                orb_checks += 1
 
-    return phash_matches, orb_matches, orb_checks
+def _descriptors(index):
+    start, stop = _worker["spans"][index]
+    return _worker["table"][start:stop]
 
 
-def _write_report(output_file, phash_matches, orb_matches, orb_checks, orb_threshold):
-    """Write the human-readable similarity report."""
-    with open(output_file, "w") as f:
-        f.write("=" * 60 + "\n")
-        f.write("PERCEPTUAL HASH MATCHES\n")
-        f.write("=" * 60 + "\n")
-
-        for distance in sorted(phash_matches.keys()):
-            f.write(f"\n{'='*60}\n")
-            f.write(f"Hamming Distance: {distance}\n")
-            f.write(f"{'='*60}\n\n")
-
-            for pair in phash_matches[distance]:
-                f.write(f"UUID1: {pair['uuid1']}\n")
-                f.write(f"UUID2: {pair['uuid2']}\n")
-                f.write(f"pHash1: {pair['phash1']}\n")
-                f.write(f"pHash2: {pair['phash2']}\n")
-                f.write("\n")
-
-        f.write("\n" + "=" * 60 + "\n")
-        f.write("ORB FEATURE MATCHES (for pHash distance <= 5 only)\n")
-        f.write("=" * 60 + "\n\n")
-
-        # Sort by score (highest first)
-        orb_matches.sort(key=lambda x: x["orb_score"], reverse=True)
-
-        for match in orb_matches:
-            f.write(f"UUID1: {match['uuid1']}\n")
-            f.write(f"UUID2: {match['uuid2']}\n")
-            f.write(f"pHash Distance: {match['phash_distance']}\n")
-            f.write(f"ORB Score: {match['orb_score']} good matches\n")
-            f.write("\n")
+def _orb_group(train, queries):
+    """Score ORB matches of each (query, distance) against card `train`.
 
-        # Summary
+    Pairs are grouped by train card so the FLANN matcher builds the train
+    card's LSH index once for all of them. Returns (query, train, distance,
+    good matches).
+    """
+    matcher = _worker["matcher"]
+    train_features = _descriptors(train)
+    if _worker["kind"] == "flann":
+        matcher.clear()
+        matcher.add([train_features])
+        matcher.train()
+    results = []
+    for query, distance in queries:
+        if _worker["kind"] == "flann":
+            try:
+                matches = matcher.knnMatch(_descriptors(query), k=2)
+            except Exception:
+                matches = []
+            score = _good_matches(matches)
+        else:
+            score = orb_similarity(_descriptors(query), train_features, matcher=matcher)
+        results.append((query, train, distance, score))
+    return results
+
+
+def _share_descriptors(cards, orb_pairs):
+    """Copy the descriptors the ORB pairs use into one shared memory block.
+
+    Returns (SharedMemory, total rows, {card index: (start, stop) rows}).
+    """
+    used = sorted({i for pair in orb_pairs for i in pair[:2]})
+    spans = {}
+    total_rows = 0
+    for i in used:
+        rows = len(cards[i]["orb_features"])
+        spans[i] = (total_rows, total_rows + rows)
+        total_rows += rows
+    shm = shared_memory.SharedMemory(
+        create=True, size=max(1, total_rows * ORB_DESCRIPTOR_BYTES)
+    )
+    table = np.ndarray(
+        (total_rows, ORB_DESCRIPTOR_BYTES), dtype=np.uint8, buffer=shm.buf
+    )
+    for i, (start, stop) in spans.items():
+        table[start:stop] = cards[i]["orb_features"]
+    del table  # no exported views may outlive shm.close()
+    return shm, total_rows, spans
+
+
+def _run_orb_checks(cards, orb_pairs, orb_threshold, workers, kind):
+    """Yield ORB matches as their checks complete.
+
+    Descriptors are loaded into shared memory once and the checks fan out to
+    `workers` processes, a task per train card. With one worker (or few
+    pairs) they run in this process instead.
+    """
+    if not orb_pairs:
+        return
+    groups = defaultdict(list)
+    for i, j, distance in orb_pairs:
+        groups[j].append((i, distance))
+
+    shm, total_rows, spans = _share_descriptors(cards, orb_pairs)
+    pool = None
+    try:
+        if workers <= 1 or len(groups) < 2:
+            _init_orb_worker(shm.name, total_rows, spans, kind)
+            completed = (_orb_group(j, queries) for j, queries in groups.items())
+        else:
+            pool = ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_orb_worker,
+                initargs=(shm.name, total_rows, spans, kind),
+            )
+            futures = [pool.submit(_orb_group, j, q) for j, q in groups.items()]
+            completed = (future.result() for future in as_completed(futures))
+
+        done = 0
+        for results in completed:
+            for i, j, distance, score in results:
+                if score >= orb_threshold:
+                    yield {
+                        "uuid1": cards[i]["uuid"],
+                        "uuid2": cards[j]["uuid"],
+                        "orb_score": score,
+                        "phash_distance": distance,
+                    }
+            before, done = done, done + len(results)
+            if done // 1000 > before // 1000 or done == len(orb_pairs):
+                print(f"ORB progress: {done}/{len(orb_pairs)}")
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+        _worker.clear()
+        shm.close()
+        shm.unlink()
+
+
+# ---------- Report ----------
+
+
+def _write_phash_section(f, phash_matches):
+    f.write("=" * 60 + "\n")
+    f.write("PERCEPTUAL HASH MATCHES\n")
+    f.write("=" * 60 + "\n")
+
+    for distance in sorted(phash_matches.keys()):
         f.write(f"\n{'='*60}\n")
-        f.write("SUMMARY\n")
-        f.write(f"{'='*60}\n")
-        f.write("pHash Matches:\n")
-        for distance in sorted(phash_matches.keys()):
-            f.write(f"  Distance {distance}: {len(phash_matches[distance])} pairs\n")
-        f.write(
-            f"\nORB Matches (pHash <= 5): {len(orb_matches)} pairs "
-            f"(threshold: {orb_threshold} good matches)\n"
-        )
-        f.write(f"Total ORB checks performed: {orb_checks}\n")
+        f.write(f"Hamming Distance: {distance}\n")
+        f.write(f"{'='*60}\n\n")
+
+        for pair in phash_matches[distance]:
+            f.write(f"UUID1: {pair['uuid1']}\n")
+            f.write(f"UUID2: {pair['uuid2']}\n")
+            f.write(f"pHash1: {pair['phash1']}\n")
+            f.write(f"pHash2: {pair['phash2']}\n")
+            f.write("\n")
+
+    f.write("\n" + "=" * 60 + "\n")
+    f.write("ORB FEATURE MATCHES (for pHash distance <= 5 only, as found)\n")
+    f.write("=" * 60 + "\n\n")
 
 
-def find_similar_hashes(db_path, output_file, phash_threshold=5, orb_threshold=30):
-    """Find pairs of images with similar pHashes or ORB features."""
+def _write_orb_match(f, match):
+    f.write(f"UUID1: {match['uuid1']}\n")
+    f.write(f"UUID2: {match['uuid2']}\n")
+    f.write(f"pHash Distance: {match['phash_distance']}\n")
+    f.write(f"ORB Score: {match['orb_score']} good matches\n")
+    f.write("\n")
+
+
+def _write_summary(f, phash_matches, orb_matches, orb_checks, orb_threshold):
+    f.write(f"\n{'='*60}\n")
+    f.write("SUMMARY\n")
+    f.write(f"{'='*60}\n")
+    f.write("pHash Matches:\n")
+    for distance in sorted(phash_matches.keys()):
+        f.write(f"  Distance {distance}: {len(phash_matches[distance])} pairs\n")
+    f.write(
+        f"\nORB Matches (pHash <= 5): {len(orb_matches)} pairs "
+        f"(threshold: {orb_threshold} good matches)\n"
+    )
+    # The ORB section above is in completion order; best first here.
+    for match in sorted(orb_matches, key=lambda x: x["orb_score"], reverse=True):
+        f.write(f"  {match['orb_score']:>4}  {match['uuid1']}  {match['uuid2']}\n")
+    f.write(f"Total ORB checks performed: {orb_checks}\n")
+
+
+def find_similar_hashes(
+    db_path,
+    output_file,
+    phash_threshold=5,
+    orb_threshold=30,
+    workers=None,
+    matcher="bf",
+):
+    """Find pairs of images with similar pHashes or ORB features.
+
+    ORB matches are written to the report as their checks complete, so a
+    long run shows results early.
+    """
 
     print(f"Loading cards from database: {db_path}")
     cards = load_cards_from_db(db_path)
     print(f"Loaded {len(cards)} cards")
 
-    print("Comparing all pairs...")
-    phash_matches, orb_matches, orb_checks = _compare_all_pairs(
-        cards, phash_threshold, orb_threshold
-    )
-    print(f"Total ORB checks performed: {orb_checks}")
-
-    _write_report(output_file, phash_matches, orb_matches, orb_checks, orb_threshold)
+    print("Finding similar pairs...")
+    phash_matches, orb_pairs = _compare_all_pairs(cards, phash_threshold)
+    print(f"ORB checks to perform: {len(orb_pairs)}")
 
+    orb_matches = []
+    with open(output_file, "w") as f:
+        _write_phash_section(f, phash_matches)
+        f.flush()
+        for match in _run_orb_checks(
+            cards, orb_pairs, orb_threshold, workers or os.cpu_count() or 1, matcher
+        ):
+            orb_matches.append(match)
+            _write_orb_match(f, match)
+            f.flush()
+        _write_summary(f, phash_matches, orb_matches, len(orb_pairs), orb_threshold)
+
+    orb_matches.sort(key=lambda x: x["orb_score"], reverse=True)
     return phash_matches, orb_matches
 
 
@@ -236,6 +432,20 @@ if __name__ == "__main__":
         default=30,
         help="ORB good matches threshold (default: 30)",
     )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=None,
+        help="Processes for ORB checks (default: CPU count)",
+    )
+    parser.add_argument(
+        "-m",
+        "--matcher",
+        choices=("bf", "flann"),
+        default="bf",
+        help="ORB matcher: exact brute force or approximate FLANN/LSH (default: bf)",
+    )
 
     args = parser.parse_args()
 
@@ -244,6 +454,8 @@ if __name__ == "__main__":
         args.output,
         phash_threshold=args.phash_threshold,
         orb_threshold=args.orb_threshold,
+        workers=args.workers,
+        matcher=args.matcher,
     )
 
     print(f"\nResults written to {args.output}")
@@ -4,21 +4,40 @@ generate_hashes.py
 :author: Brandon Arrendondo
 
 :license: MIT
+
+Images are hashed across --workers processes, and results are inserted in
+batches, committed every COMMIT_EVERY images, so a crash loses at most one
+batch. Each row records the file's size, mtime and sha256 and the ORB
+feature count it was built with; a rerun skips files whose size and mtime
+are unchanged, and files that were only touched (same sha256) are not
+re-extracted either. --force recomputes everything.
 """
 
 import sys
 import argparse
+import hashlib
 import logging
 import imagehash
 import os
 import glob
 import cv2
 import sqlite3
+from multiprocessing import Pool
 from PIL import Image
 
-__version__ = "%(prog)s 3.0.0 (Rel: 29 Sep 2025)"
+__version__ = "%(prog)s 3.1.0 (Rel: 19 Oct 2026)"
 default_log_format = "%(filename)s:%(levelname)s:%(asctime)s] %(message)s"
 
+COMMIT_EVERY = 200
+
+# Columns added to image_hashes for skip-if-unchanged, with their types.
+FILE_COLUMNS = {
+    "file_size": "INTEGER",
+    "file_mtime_ns": "INTEGER",
+    "file_sha256": "TEXT",
+    "orb_nfeatures": "INTEGER",
+}
+
 
 def create_database(db_path):
     """Create the SQLite database with optimized schema."""
@@ -33,6 +52,13 @@ def create_database(db_path):
         )
     """)
 
+    # Databases from before 3.1 lack the file columns; their rows have no
+    # stamp and are recomputed once.
+    existing = {row[1] for row in c.execute("PRAGMA table_info(image_hashes)")}
+    for name, sql_type in FILE_COLUMNS.items():
+        if name not in existing:
+            c.execute(f"ALTER TABLE image_hashes ADD COLUMN {name} {sql_type}")
+
     # Index on phash for faster lookups
     c.execute("CREATE INDEX IF NOT EXISTS idx_phash ON image_hashes(phash)")
 
@@ -51,10 +77,12 @@ def get_perceptual_hash(image_path, hash_size=8):
         return None
 
 
-def get_orb_features(image_path, n_features=100):
+def get_orb_features(image_path, n_features=100, orb=None):
     """
     Extract ORB features from an image.
 
+    Pass an ORB detector as `orb` to reuse one across images.
+
     Returns:
         numpy array of descriptors or None
     """
@@ -63,7 +91,7 @@ def get_orb_features(image_path, n_features=100):
         if img is None:
             return None
 
-        orb = cv2.ORB_create(nfeatures=n_features)
+        orb = orb or cv2.ORB_create(nfeatures=n_features)
         keypoints, descriptors = orb.detectAndCompute(img, None)
 
         return descriptors
@@ -72,6 +100,58 @@ def get_orb_features(image_path, n_features=100):
         return None
 
 
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1 << 20):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def load_stamps(conn):
+    """db_uuid -> (size, mtime_ns, sha256, nfeatures) of every hashed image."""
+    return {
+        row[0]: row[1:]
+        for row in conn.execute(
+            "SELECT db_uuid, file_size, file_mtime_ns, file_sha256, orb_nfeatures "
+            "FROM image_hashes"
+        )
+    }
+
+
+# Per worker process: one ORB detector for every image it handles.
+_worker = {}
+
+
+def _init_worker(n_features):
+    # The pool already uses every core; OpenCV's own threads would only
+    # contend with it.
+    cv2.setNumThreads(1)
+    _worker["orb"] = cv2.ORB_create(nfeatures=n_features)
+
+
+def process_image(job):
+    """Hash one image (runs in a worker process).
+
+    `job` is (filepath, uuid, size, mtime_ns, known sha256 or None). Returns
+    (status, uuid, row): status "unchanged" if the content matches the known
+    sha256, "failed" if no pHash could be computed, else "ok".
+    """
+    filepath, uuid, size, mtime_ns, known_sha = job
+    sha = file_sha256(filepath)
+    if sha == known_sha:
+        return "unchanged", uuid, (size, mtime_ns, uuid)
+
+    phash = get_perceptual_hash(filepath)
+    if not phash:
+        return "failed", uuid, None
+
+    orb_descriptors = get_orb_features(filepath, orb=_worker["orb"])
+    orb_blob = orb_descriptors.tobytes() if orb_descriptors is not None else None
+    orb_count = len(orb_descriptors) if orb_descriptors is not None else 0
+    return "ok", uuid, (phash, orb_blob, size, mtime_ns, sha, orb_count)
+
+
 def main(argv):
     parser = argparse.ArgumentParser()
     parser.add_argument("dirpath", help="Directory containing images")
@@ -88,6 +168,19 @@ def main(argv):
         default=100,
         help="Number of ORB features to extract (default: 100)",
     )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Worker processes (default: CPU count)",
+    )
+    parser.add_argument(
+        "-f",
+        "--force",
+        action="store_true",
+        help="Recompute every image, even unchanged ones",
+    )
     parser.add_argument(
         "-v", "--verbose", help="Increase output verbosity", action="store_true"
     )
@@ -114,49 +207,88 @@ def main(argv):
     pattern = os.path.join(args.dirpath, "**", "*.webp")
     files = list(glob.glob(pattern, recursive=True))
 
-    print(f"Found {len(files)} images to process")
-
-    processed = 0
-    failed = 0
+    print(f"Found {len(files)} images")
 
-    for i, filepath in enumerate(files, 1):
+    stamps = {} if args.force else load_stamps(conn)
+    jobs = []
+    skipped = 0
+    for filepath in files:
         uuid = os.path.splitext(os.path.basename(filepath))[0]
-
-        # Get pHash
-        phash = get_perceptual_hash(filepath)
-        if not phash:
-            failed += 1
+        st = os.stat(filepath)
+        size, mtime_ns, sha, nfeatures = stamps.get(uuid, (None,) * 4)
+        if nfeatures != args.nfeatures:
+            sha = None  # built with other settings (or never): recompute
+        elif size == st.st_size and mtime_ns == st.st_mtime_ns:
+            skipped += 1
             continue
+        jobs.append((filepath, uuid, st.st_size, st.st_mtime_ns, sha))
 
-        # Get ORB features
-        orb_descriptors = get_orb_features(filepath, n_features=args.nfeatures)
-        orb_blob = orb_descriptors.tobytes() if orb_descriptors is not None else None
+    print(f"Unchanged since the last run: {skipped}; to process: {len(jobs)}")
 
-        # Insert into database
+    processed = 0
+    unchanged = 0
+    failed = 0
+    rows = []
+    touched = []
+
+    def flush():
         try:
-            cursor.execute(
-                "INSERT OR REPLACE INTO image_hashes (db_uuid, phash, orb_features) VALUES (?, ?, ?)",
-                (uuid, phash, orb_blob),
+            cursor.executemany(
+                "INSERT OR REPLACE INTO image_hashes (db_uuid, phash, orb_features, "
+                "file_size, file_mtime_ns, file_sha256, orb_nfeatures) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
             )
-            processed += 1
-
-            if args.verbose:
-                orb_count = len(orb_descriptors) if orb_descriptors is not None else 0
-                logging.debug(
-                    f"[{i}/{len(files)}] {uuid}: phash={phash}, orb_features={orb_count}"
-                )
-            elif i % 100 == 0:
-                print(f"Progress: {i}/{len(files)}")
-
+            cursor.executemany(
+                "UPDATE image_hashes SET file_size = ?, file_mtime_ns = ? "
+                "WHERE db_uuid = ?",
+                touched,
+            )
+            conn.commit()
         except sqlite3.Error as e:
-            logging.error(f"Database error for {uuid}: {e}")
-            failed += 1
+            logging.error(f"Database error writing a batch of {len(rows)}: {e}")
+            raise
+        rows.clear()
+        touched.clear()
+
+    with Pool(
+        processes=max(1, args.workers),
+        initializer=_init_worker,
+        initargs=(args.nfeatures,),
+    ) as pool:
+        try:
+            results = pool.imap_unordered(process_image, jobs, chunksize=8)
+            for i, (status, uuid, row) in enumerate(results, 1):
+                if status == "failed":
+                    failed += 1
+                elif status == "unchanged":
+                    unchanged += 1
+                    touched.append(row)
+                else:
+                    phash, orb_blob, size, mtime_ns, sha, orb_count = row
+                    rows.append(
+                        (uuid, phash, orb_blob, size, mtime_ns, sha, args.nfeatures)
+                    )
+                    processed += 1
+                    if args.verbose:
+                        logging.debug(
+                            f"[{i}/{len(jobs)}] {uuid}: phash={phash}, "
+                            f"orb_features={orb_count}"
+                        )
+
+                if len(rows) + len(touched) >= COMMIT_EVERY:
+                    flush()
+                if not args.verbose and i % 100 == 0:
+                    print(f"Progress: {i}/{len(jobs)}")
+        finally:
+            # Also on Ctrl-C or an error: keep what was already computed.
+            flush()
 
-    conn.commit()
     conn.close()
 
     print("\nCompleted!")
     print(f"Successfully processed: {processed}")
+    print(f"Unchanged (skipped): {skipped + unchanged}")
     print(f"Failed: {failed}")
     print(f"Database size: {os.path.getsize(args.output) / (1024*1024):.2f} MB")
 
@@ -13,6 +13,8 @@ from bs4 import BeautifulSoup
 import yaml
 from rapidfuzz import fuzz
 
+from cards_yaml import read_cards
+
 __version__ = "%(prog)s 1.0.0 (Rel: 25 Sep 2025)"
 default_log_format = "%(filename)s:%(levelname)s:%(asctime)s] %(message)s"
 
@@ -73,8 +75,7 @@ def main(argv):
             unique_links.append(link)
 
     # Find the name of the URL in cards_yaml
-    with open(args.cards_yaml, "r") as f:
-        cards_data = yaml.safe_load(f)
+    cards_data = read_cards(args.cards_yaml)
 
     cards_in_play = {}
     for card in cards_data:
@@ -2,7 +2,7 @@
 import sys
 import argparse
 import logging
-import yaml
+from cards_yaml import read_cards
 import os
 import glob
 
@@ -10,11 +10,6 @@ __version__ = "%(prog)s 1.0.0 (Rel: 04 Sep 2025)"
 default_log_format = "%(filename)s:%(levelname)s:%(asctime)s] %(message)s"
 
 
-def read_yaml(path: str):
-    with open(path) as f:
-        return yaml.safe_load(f)
-
-
 def main(argv):
     parser = argparse.ArgumentParser()
     parser.add_argument("cards")
@@ -44,7 +39,7 @@ def main(argv):
     else:
         logging.getLogger().setLevel(logging.INFO)
 
-    cards_yaml = read_yaml(args.cards)
+    cards_yaml = read_cards(args.cards)
 
     db_uuids = []
     for item in cards_yaml: